@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from ..cache import prime_permission_cache
 
 
 class AccountPermission(permissions.DjangoModelPermissionsOrAnonReadOnly):
@@ -16,5 +17,19 @@ class AccountPermission(permissions.DjangoModelPermissionsOrAnonReadOnly):
 
         queryset = self._queryset(view)
         perms = self.get_required_permissions(request.method, queryset.model)
+        if perms and not request.user.is_superuser:
+            prime_permission_cache(request.user)
 
         return request.user.has_perms(perms)
+
+
+class AccountExportPermission(AccountPermission):
+    """
+    Bulk reads need the view permission of the model
+    """
+
+    authenticated_users_only = True
+    perms_map = {
+        **AccountPermission.perms_map,
+        "GET": ["%(app_label)s.view_%(model_name)s"],
+    }
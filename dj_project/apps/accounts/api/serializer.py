@@ -3,33 +3,42 @@ import pdb
 from copy import copy
 from django.forms import ImageField
 from django.contrib.auth.models import Group, Permission
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.fields import ImageField
 from rest_framework.utils import model_meta
 from rest_framework.settings import api_settings
+from core.drf.fieldsets import SparseFieldsetMixin
+from core.helper import get_srcset
+from core.m2m_helper import sync_m2m
 from ..models import User, GroupProfile
-from ..eums import PASSWORD_NOT_MATCH
+from ..eums import PASSWORD_NOT_MATCH, MembersModeEnum
 
 
 class ProfileImageSerializer(ImageField):
     pass
 
 
-class GroupProfileSerializer(serializers.ModelSerializer):
+class GroupProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = GroupProfile
         fields = ("image", "is_active")
 
 
-class UserGroupSerializer(serializers.ModelSerializer):
+class UserGroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     profile = GroupProfileSerializer(required=False)
     image = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+    field_sources = {
+        "image": ["profile__image"],
+        "srcset": ["profile__image", "profile__image_derivatives"],
+    }
 
     class Meta:
 
         model = Group
-        fields = ("id", "name", "profile", "image")
+        fields = ("id", "name", "profile", "image", "srcset")
 
     def to_internal_value(self, data):
         return data
@@ -44,13 +53,26 @@ class UserGroupSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(instance.profile.image.url)
         return None
 
+    def get_srcset(self, instance):
+        if not hasattr(instance, "profile"):
+            return {}
+        return {
+            "image": get_srcset(
+                instance.profile.image,
+                "image",
+                instance.profile,
+                self.context.get("request"),
+            )
+        }
+
 
 class AccountImage(ImageField):
     pass
 
 
-class UserBaseSerializer(serializers.ModelSerializer):
+class UserBaseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     thumbnail = AccountImage()
+    field_sources = {"profile_image": ["profile_picture"]}
 
     class Meta:
         """Base Account Meta"""
@@ -80,6 +102,11 @@ class UserSerializer(UserBaseSerializer):
 
     email = serializers.EmailField(required=True)
     groups = UserGroupSerializer(required=False, many=True)
+    srcset = serializers.SerializerMethodField()
+    field_sources = {
+        **UserBaseSerializer.field_sources,
+        "srcset": ["profile_picture", "cover", "image_derivatives"],
+    }
 
     class Meta:
         """Base Account Meta"""
@@ -100,8 +127,18 @@ class UserSerializer(UserBaseSerializer):
             "groups",
             "thumbnail",
             "last_updated",
+            "srcset",
         ]
 
+    def get_srcset(self, instance):
+        request = self.context.get("request")
+        return {
+            field_name: get_srcset(
+                getattr(instance, field_name), field_name, instance, request
+            )
+            for field_name in ("profile_picture", "cover")
+        }
+
 
 class UserCreateSerializer(UserBaseSerializer):
     profile_image = ProfileImageSerializer(required=False, allow_null=True)
@@ -199,26 +236,14 @@ class UserEditSerializer(serializers.ModelSerializer):
                 m2m_fields.append((attr, value))
             else:
                 setattr(instance, attr, value)
-        instance.save()
-        for _attr, _values in m2m_fields:
-            old_values = getattr(instance, _attr).values_list("id", flat=True)
-            for _value in _values:
-                relation_ins = info.relations[_attr].related_model.objects.get(
-                    id=_value
-                )
-                related_field = getattr(instance, _attr)
-                related_field.add(relation_ins)
-            for _value in old_values:
-                if _value not in _values:
-                    relation_ins = info.relations[_attr].related_model.objects.get(
-                        id=_value
-                    )
-                    related_field = getattr(instance, _attr)
-                    related_field.remove(relation_ins)
+        with transaction.atomic():
+            instance.save()
+            for _attr, _values in m2m_fields:
+                sync_m2m(instance, _attr, _values)
         return instance
 
 
-class PermissionSerializer(serializers.ModelSerializer):
+class PermissionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Permission
@@ -228,7 +253,7 @@ class PermissionSerializer(serializers.ModelSerializer):
         return data.get("id")
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     profile = GroupProfileSerializer(required=False)
     permissions = PermissionSerializer(many=True, required=False)
     members = UserBaseSerializer(many=True, source="account_set", required=False)
@@ -238,6 +263,21 @@ class GroupSerializer(serializers.ModelSerializer):
         model = Group
         fields = ("id", "name", "profile", "permissions", "members")
 
+    def get_fields(self):
+        fields = super().get_fields()
+        mode = self.context.get("members", MembersModeEnum.DEFAULT.value)
+        if "members" not in fields:
+            return fields
+        if mode == MembersModeEnum.COUNT.value:
+            fields["members"] = serializers.IntegerField(
+                source="members_count", read_only=True
+            )
+        elif mode == MembersModeEnum.IDS.value:
+            fields["members"] = serializers.PrimaryKeyRelatedField(
+                source="account_set", many=True, read_only=True
+            )
+        return fields
+
     def to_internal_value(self, data):
         final_data = {
             "name": data.get("name"),
@@ -262,33 +302,18 @@ class GroupSerializer(serializers.ModelSerializer):
             group_ins, is_profile_created = GroupProfile.objects.get_or_create(
                 group=group,
             )
-            if validated_data.get("permissions"):
-                permissions = validated_data["permissions"]
-                for permission in permissions:
-                    permission_ins = Permission.objects.get(id=permission)
-                    group.permissions.add(permission_ins)
+            sync_m2m(group, "permissions", validated_data.get("permissions"))
             if validated_data.get("profile") and validated_data["profile"]["image"]:
                 group_ins.image = validated_data["profile"]["image"]
                 group_ins.save()
+                group_ins.queue_image_job()
         return group
 
     def update(self, instance, validated_data):
         if instance.name != validated_data.get("name"):
             instance.name = validated_data.get("name")
             instance.save()
-        if validated_data.get("permissions"):
-            permissions = validated_data["permissions"]
-            old_permissions = instance.permissions.values_list("id", flat=True)
-
-            for permission in permissions:
-                permission_ins = Permission.objects.get(id=permission)
-                instance.permissions.add(permission_ins)
-            for permission in old_permissions:
-                if permission not in permissions:
-                    permission_ins = Permission.objects.get(id=permission)
-                    instance.permissions.remove(permission_ins)
-        else:
-            instance.permissions.clear()
+        sync_m2m(instance, "permissions", validated_data.get("permissions"))
 
         if validated_data.get("profile") and "image" in validated_data["profile"]:
             group_ins, is_profile_created = GroupProfile.objects.get_or_create(
@@ -296,6 +321,7 @@ class GroupSerializer(serializers.ModelSerializer):
             )
             group_ins.image = validated_data["profile"]["image"]
             group_ins.save()
+            group_ins.queue_image_job()
         return instance
 
 
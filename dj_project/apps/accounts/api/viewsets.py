@@ -1,16 +1,27 @@
 import pdb
 import json
 from django.conf import settings
-from django.db.models import Count
+from django.db.models import Count, Func, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import Group, Permission
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import status
 from django.core.validators import validate_email
+from core.cache import cache_response
 from core.drf.authenticators import CsrfExemptSessionAuthentication
+from core.drf.pagination import KeysetPagination
+from core.drf.prefetch import PrefetchPlanMixin
+from core.streaming import (
+    export_response,
+    get_output_format,
+    ndjson_response,
+    read_rows,
+)
 from django.contrib.auth import authenticate, login, logout, password_validation
 from core.helper import is_token_valid, decode_uid
+from core.media_helper import release_upload
 from django.forms import ValidationError
 from .serializer import (
     PermissionSerializer,
@@ -21,12 +32,14 @@ from .serializer import (
     UserProfileSerializer,
     UserGroupSerializer,
 )
-from .permissions import AccountPermission
+from .permissions import AccountExportPermission, AccountPermission
 from .filters import GroupFilter, UserFilter
-from ..models import User
+from ..models import GroupProfile, User
 from ..forms import LoginForm, SignUpForm
-from ..eums import PASSWORD_NOT_MATCH, ThemeEnum
+from ..bulk import EXPORT_FIELDS, export_users, import_users
+from ..eums import PASSWORD_NOT_MATCH, BulkActionEnum, MembersModeEnum, ThemeEnum
 from ..notification import send_password_reset_email
+from ..typeahead import search_users
 
 
 def get_user_by_uid(uid):
@@ -201,12 +214,13 @@ class AuthViewset(ModelViewSet):
             return Response({"theme_mode": theme}, status=200)
 
 
-class UserAccountViewSets(ModelViewSet):
+class UserAccountViewSets(PrefetchPlanMixin, ModelViewSet):
     """Base User ViewSet"""
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AccountPermission]
+    pagination_class = KeysetPagination
     filterset_class = UserFilter
     filterset_fields = (
         "theme_mode",
@@ -227,6 +241,83 @@ class UserAccountViewSets(ModelViewSet):
         "last_name",
         "email",
     )
+    ordering_fields = (
+        "id",
+        "username",
+        "first_name",
+        "last_name",
+        "email",
+        "date_joined",
+    )
+    ordering = ("id",)
+
+    @cache_response(User, Group, GroupProfile)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(User, Group, GroupProfile)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"])
+    def typeahead(self, request):
+        """
+        Up to ``limit`` (default 10, max 50) active users whose username or
+        email starts with ``q``, served from the in-process prefix index
+        """
+        prefix = request.query_params.get("q", "").strip()
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), 50)
+        except ValueError:
+            limit = 10
+        if not prefix or limit < 1:
+            return Response({"results": []})
+
+        storage = User._meta.get_field("thumbnail").storage
+        results = [
+            {
+                "id": user_id,
+                "username": username,
+                "thumbnail": (
+                    request.build_absolute_uri(storage.url(thumbnail))
+                    if thumbnail
+                    else None
+                ),
+            }
+            for user_id, username, thumbnail in search_users(prefix, limit)
+        ]
+        return Response({"results": results})
+
+    @action(detail=False, methods=["post", "patch", "delete"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Import users from an NDJSON or CSV body: POST creates, PATCH updates
+        and DELETE deactivates them. Streams one NDJSON result per row and a
+        final summary.
+        """
+        bulk_action = {
+            "POST": BulkActionEnum.CREATE.value,
+            "PATCH": BulkActionEnum.UPDATE.value,
+            "DELETE": BulkActionEnum.DEACTIVATE.value,
+        }[request.method]
+        return ndjson_response(
+            import_users(read_rows(request), bulk_action, changed_by=request.user)
+        )
+
+    @action(
+        detail=False, methods=["get"], permission_classes=[AccountExportPermission]
+    )
+    def export(self, request):
+        """
+        Stream the filtered users as NDJSON, or CSV with ``?output=csv``
+        """
+        queryset = self.filter_queryset(User.objects.all())
+        return export_response(
+            export_users(queryset),
+            EXPORT_FIELDS,
+            get_output_format(request),
+            "users",
+        )
 
     def get_authenticators(self):
         if not settings.IS_PROD:
@@ -235,7 +326,8 @@ class UserAccountViewSets(ModelViewSet):
 
     def perform_create(self, serializer):
         super().perform_create(serializer)
-        serializer.instance.create_thumbnail()
+        if serializer.instance.profile_picture:
+            serializer.instance.queue_thumbnail()
 
     def create(self, request, *args, **kwargs):
         data = request.data
@@ -275,13 +367,16 @@ class UserAccountViewSets(ModelViewSet):
         serializer = UserEditSerializer(instance, data=request.data)
         is_valid = serializer.is_valid(raise_exception=False)
         if is_valid:
+            previous = instance.profile_picture.name
             self.perform_update(serializer)
             if request.data.get("profile_image") == "null":
                 serializer.instance.profile_picture = None
                 serializer.instance.thumbnail = None
                 serializer.instance.save()
-            else:
-                serializer.instance.create_thumbnail()
+            elif "profile_image" in serializer.validated_data:
+                serializer.instance.queue_thumbnail()
+            if serializer.instance.profile_picture.name != previous:
+                release_upload(previous)
             _status = status.HTTP_201_CREATED
             msg = "successfully updated user"
         else:
@@ -312,7 +407,7 @@ class UserAccountViewSets(ModelViewSet):
         )
 
 
-class GroupViewSets(ModelViewSet):
+class GroupViewSets(PrefetchPlanMixin, ModelViewSet):
     """Base User ViewSet"""
 
     queryset = Group.objects.filter(profile__is_active=True)
@@ -325,11 +420,45 @@ class GroupViewSets(ModelViewSet):
         "name",
     )
 
+    def get_members_mode(self):
+        """
+        How members are rendered: ``?members=count|ids|full``
+        """
+        mode = self.request.query_params.get("members")
+        if mode in [member_mode.value for member_mode in MembersModeEnum]:
+            return mode
+        return MembersModeEnum.DEFAULT.value
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["members"] = self.get_members_mode()
+        return context
+
     def get_queryset(self):
         queryset = super().get_queryset()
         queryset = queryset.annotate(count=Count("id"))
+        if self.get_members_mode() == MembersModeEnum.COUNT.value:
+            # Counted through User.objects, the manager account_set lists
+            # the members of the other modes with (active users only)
+            members = (
+                User.objects.filter(groups=OuterRef("pk"))
+                .order_by()
+                .annotate(total=Func("pk", function="COUNT"))
+                .values("total")
+            )
+            queryset = queryset.annotate(
+                members_count=Coalesce(Subquery(members), 0)
+            )
         return queryset
 
+    @cache_response(Group, GroupProfile, Permission, User)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(Group, GroupProfile, Permission, User)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_authenticators(self):
         if not settings.IS_PROD:
             return [CsrfExemptSessionAuthentication()]
@@ -412,26 +541,42 @@ class GroupViewSets(ModelViewSet):
         )
 
 
-class PermissionViewSets(ModelViewSet):
+class PermissionViewSets(PrefetchPlanMixin, ModelViewSet):
 
     queryset = Permission.objects.all()
     serializer_class = PermissionSerializer
     permission_classes = [AccountPermission]
     filterset_fields = ("name", "id", "codename")
 
+    @cache_response(Permission)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(Permission)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_authenticators(self):
         if not settings.IS_PROD:
             return [CsrfExemptSessionAuthentication()]
         return super().get_authenticators()
 
 
-class UserProfileViewSets(ModelViewSet):
+class UserProfileViewSets(PrefetchPlanMixin, ModelViewSet):
 
     queryset = User.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [AccountPermission]
     filterset_class = UserFilter
 
+    @cache_response(User, Group, GroupProfile, Permission)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(User, Group, GroupProfile, Permission)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_authenticators(self):
         if not settings.IS_PROD:
             return [CsrfExemptSessionAuthentication()]
@@ -441,13 +586,21 @@ class UserProfileViewSets(ModelViewSet):
         return super().get_queryset()
 
 
-class UserGroupViewSets(ModelViewSet):
+class UserGroupViewSets(PrefetchPlanMixin, ModelViewSet):
 
     queryset = Group.objects.all()
     serializer_class = UserGroupSerializer
     permission_classes = [AccountPermission]
     filterset_class = GroupFilter
 
+    @cache_response(Group, GroupProfile)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(Group, GroupProfile)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_authenticators(self):
         if not settings.IS_PROD:
             return [CsrfExemptSessionAuthentication()]
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.accounts"
+
+    def ready(self):
+        from django.contrib.auth.models import Group, Permission
+        from core.cache import register_invalidation
+        from . import signals  # noqa: F401
+        from .models import GroupProfile, User
+
+        register_invalidation(User, Group, GroupProfile, Permission)
@@ -0,0 +1,329 @@
+"""
+Bulk import and export of users
+
+Imports take NDJSON or CSV rows (see ``core.streaming``) and handle them in
+chunks of ``CHUNK_SIZE``: each chunk is validated with a single query for
+the users it refers to, its passwords are hashed in a process pool (see
+``core.passwords``) and it is written with ``bulk_create``/``bulk_update``
+in its own transaction. One result per row is yielded as soon as its chunk
+is written, followed by a summary.
+
+Bulk writes skip the model signals, so the change history, the cache
+versions and the typeahead index are updated here instead.
+"""
+
+from itertools import islice
+
+from django.contrib.auth import password_validation
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from core.cache import bump_versions
+from core.passwords import hash_passwords
+from .eums import BulkActionEnum
+from .models import User, UserChangeHistory
+from .typeahead import update_users
+
+CHUNK_SIZE = 1000
+EXPORT_FIELDS = [
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "is_staff",
+    "theme_mode",
+    "date_joined",
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class BulkUserSerializer(serializers.ModelSerializer):
+    """
+    Validates one imported row. Uniqueness is checked per chunk rather than
+    per row, so the username field only keeps its format validator.
+    """
+
+    password = serializers.CharField(
+        required=False, write_only=True, trim_whitespace=False
+    )
+
+    class Meta:
+        model = User
+        fields = [
+            "username",
+            "email",
+            "first_name",
+            "last_name",
+            "is_staff",
+            "theme_mode",
+            "password",
+        ]
+        extra_kwargs = {"username": {"validators": [UnicodeUsernameValidator()]}}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def get_lookup(row):
+    """
+    ``("id", pk)`` or ``("username", name)`` identifying the user of an
+    update/deactivate row, None when the row names neither
+    """
+    if row.get("id") not in (None, ""):
+        try:
+            return "id", int(row["id"])
+        except (TypeError, ValueError):
+            return None
+    if row.get("username"):
+        return "username", str(row["username"])
+    return None
+
+
+def get_existing(lookups):
+    """
+    ``{("id", pk): user, ("username", name): user}`` for the users of
+    ``lookups``, inactive ones included
+    """
+    ids = {value for key, value in lookups if key == "id"}
+    usernames = {value for key, value in lookups if key == "username"}
+    users = User._base_manager.filter(Q(pk__in=ids) | Q(username__in=usernames))
+    existing = {}
+    for user in users:
+        existing[("id", user.pk)] = user
+        existing[("username", user.username)] = user
+    return existing
+
+
+def get_history(user, changed_by):
+    changes = user.get_tracked_changes()
+    return [
+        UserChangeHistory(
+            user=user,
+            changed_by=changed_by,
+            field_changed=field_name,
+            old_value=old_value,
+            new_value=new_value,
+        )
+        for field_name, (old_value, new_value) in changes.items()
+    ]
+
+
+def _result(number, user=None, errors=None):
+    if errors is not None:
+        return {"row": number, "status": "error", "errors": errors}
+    return {"row": number, "status": "ok", "id": user.pk}
+
+
+def _validation_errors(error):
+    if isinstance(error, DjangoValidationError):
+        return {"password": error.messages}
+    return error.detail
+
+
+def _on_commit(users):
+    def on_commit():
+        bump_versions(User, *users)
+        update_users(users)
+
+    transaction.on_commit(on_commit)
+
+
+def set_created_ids(users):
+    """
+    Set the ids ``bulk_create`` leaves unset on backends that cannot return
+    the inserted rows (MySQL), looked up by username in the inserting
+    transaction
+    """
+    created = {user.username: user for user in users if user.pk is None}
+    if not created:
+        return
+    ids = User._base_manager.filter(username__in=created).values_list(
+        "username", "pk"
+    )
+    for username, pk in ids:
+        created[username].pk = pk
+
+
+def create_chunk(rows):
+    """
+    Insert the users of ``rows`` (``(number, data)`` pairs), returns their
+    results in order
+    """
+    serializer = BulkUserSerializer()
+    results = {}
+    valid = []
+    for number, data in rows:
+        try:
+            data = serializer.run_validation(data)
+            password = data.pop("password", None)
+            user = User(**data)
+            if password is not None:
+                password_validation.validate_password(password, user)
+        except (serializers.ValidationError, DjangoValidationError) as e:
+            results[number] = _result(number, errors=_validation_errors(e))
+            continue
+        valid.append((number, user, password))
+
+    usernames = [user.username for _, user, _ in valid]
+    taken = set(
+        User._base_manager.filter(username__in=usernames).values_list(
+            "username", flat=True
+        )
+    )
+    unique_error = User._meta.get_field("username").error_messages["unique"]
+    pending = []
+    for number, user, password in valid:
+        if user.username in taken:
+            results[number] = _result(number, errors={"username": [unique_error]})
+            continue
+        taken.add(user.username)
+        pending.append((number, user, password))
+
+    passwords = [password for _, _, password in pending if password is not None]
+    hashes = iter(hash_passwords(passwords))
+    for _, user, password in pending:
+        if password is None:
+            user.set_unusable_password()
+        else:
+            user.password = next(hashes)
+
+    users = [user for _, user, _ in pending]
+    try:
+        with transaction.atomic():
+            User._base_manager.bulk_create(users)
+            set_created_ids(users)
+            _on_commit(users)
+        for number, user, _ in pending:
+            results[number] = _result(number, user)
+    except IntegrityError:
+        # Created concurrently by someone else, save the rows one by one to
+        # find out which
+        for number, user, _ in pending:
+            user.pk = None
+            try:
+                with transaction.atomic():
+                    user.save()
+            except IntegrityError as e:
+                results[number] = _result(number, errors={"non_field_errors": [str(e)]})
+            else:
+                results[number] = _result(number, user)
+    return [results[number] for number, _ in rows]
+
+
+def update_chunk(rows, changed_by=None, deactivate=False):
+    """
+    Update (or deactivate) the users of ``rows``, matched on ``id`` or else
+    ``username``. The username itself is never changed.
+    """
+    serializer = BulkUserSerializer(partial=True)
+    results = {}
+    valid = []
+    for number, data in rows:
+        lookup = get_lookup(data)
+        if lookup is None:
+            results[number] = _result(
+                number, errors={"non_field_errors": ["An id or username is required"]}
+            )
+            continue
+        if deactivate:
+            valid.append((number, lookup, {}))
+            continue
+        try:
+            data = serializer.run_validation(data)
+        except serializers.ValidationError as e:
+            results[number] = _result(number, errors=e.detail)
+            continue
+        data.pop("username", None)
+        valid.append((number, lookup, data))
+
+    existing = get_existing([lookup for _, lookup, _ in valid])
+    now = timezone.now()
+    changed = {}
+    passwords = []
+    for number, lookup, data in valid:
+        user = existing.get(lookup)
+        if user is None:
+            results[number] = _result(
+                number, errors={"non_field_errors": ["User not found"]}
+            )
+            continue
+        if deactivate:
+            data = {"is_active": False}
+        password = data.pop("password", None)
+        if password is not None:
+            try:
+                password_validation.validate_password(password, user)
+            except DjangoValidationError as e:
+                results[number] = _result(number, errors=_validation_errors(e))
+                continue
+            passwords.append((user, password))
+        for field_name, value in data.items():
+            setattr(user, field_name, value)
+        results[number] = _result(number, user)
+        changed[user.pk] = user
+
+    hashes = hash_passwords([password for _, password in passwords])
+    for (user, _), password_hash in zip(passwords, hashes):
+        user.password = password_hash
+
+    history = []
+    fields = set()
+    users = []
+    for user in changed.values():
+        user_history = get_history(user, changed_by)
+        if not user_history:
+            continue
+        user.last_updated = now
+        history.extend(user_history)
+        fields.update(entry.field_changed for entry in user_history)
+        users.append(user)
+    if users:
+        with transaction.atomic():
+            User._base_manager.bulk_update(users, [*fields, "last_updated"])
+            UserChangeHistory.objects.bulk_create(history)
+            _on_commit(users)
+        for user in users:
+            user.take_snapshot()
+    return [results[number] for number, _ in rows]
+
+
+def import_users(rows, action, changed_by=None):
+    """
+    Apply ``action`` (a ``BulkActionEnum`` value) to ``rows``, the
+    ``(line_number, row, error)`` triples of ``core.streaming.read_rows``.
+    Yields one result per row, then ``{"summary": {...}}``.
+    """
+    summary = {"action": action, "ok": 0, "error": 0}
+    for chunk in chunked(rows, CHUNK_SIZE):
+        parsed = []
+        for number, row, error in chunk:
+            if error is not None:
+                summary["error"] += 1
+                yield _result(number, errors={"non_field_errors": [error]})
+            else:
+                parsed.append((number, row))
+        if action == BulkActionEnum.CREATE.value:
+            results = create_chunk(parsed)
+        else:
+            results = update_chunk(
+                parsed, changed_by, action == BulkActionEnum.DEACTIVATE.value
+            )
+        for result in results:
+            summary[result["status"]] += 1
+            yield result
+    yield {"summary": summary}
+
+
+def export_users(queryset):
+    """
+    Value tuples of ``EXPORT_FIELDS`` for ``queryset``, read from the
+    database ``EXPORT_CHUNK_SIZE`` rows at a time
+    """
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
@@ -0,0 +1,49 @@
+"""
+Cached session profile payload
+"""
+
+from django.contrib.auth.models import Group, Permission
+from core.cache import cache_get, cache_set, versioned_key
+from .api.serializer import UserSerializer
+from .models import GroupProfile
+
+SESSION_PROFILE_NAMESPACE = "session_profile"
+SESSION_PROFILE_TIMEOUT = 60 * 60
+PERMISSIONS_NAMESPACE = "user_permissions"
+PERMISSIONS_TIMEOUT = 60 * 60
+
+
+def get_session_profile(user):
+    """
+    Serialized ``UserSerializer`` data for ``user``. Cached per user and
+    reused until the user, or any group (names and images show up in every
+    profile), changes.
+    """
+    key = versioned_key(SESSION_PROFILE_NAMESPACE, [user, Group, GroupProfile])
+    data = cache_get(SESSION_PROFILE_NAMESPACE, key)
+    if data is None:
+        data = UserSerializer(user).data
+        cache_set(key, data, SESSION_PROFILE_TIMEOUT)
+    return data
+
+
+def get_permission_set(user):
+    """
+    ``user.get_all_permissions()``, cached per user until the user, their
+    groups or any permission assignment changes
+    """
+    key = versioned_key(PERMISSIONS_NAMESPACE, [user, Group, Permission])
+    perms = cache_get(PERMISSIONS_NAMESPACE, key)
+    if perms is None:
+        perms = frozenset(user.get_all_permissions())
+        cache_set(key, perms, PERMISSIONS_TIMEOUT)
+    return perms
+
+
+def prime_permission_cache(user):
+    """
+    Fill the permission cache ``ModelBackend`` keeps on the user object, so
+    ``has_perm``/``has_perms`` on this request run without queries
+    """
+    if user.is_authenticated and not hasattr(user, "_perm_cache"):
+        user._perm_cache = set(get_permission_set(user))
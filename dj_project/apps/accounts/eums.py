@@ -8,3 +8,25 @@ class ThemeEnum(Enum):
     DARK = "dark"
     CYAN = "cyan"
     DEFAULT = "cyan"
+
+
+class MembersModeEnum(Enum):
+    COUNT = "count"
+    IDS = "ids"
+    FULL = "full"
+    DEFAULT = "full"
+
+
+class ThumbnailStatusEnum(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    # The image was replaced before the job wrote its results
+    SKIPPED = "skipped"
+
+
+class BulkActionEnum(Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DEACTIVATE = "deactivate"
@@ -0,0 +1,160 @@
+"""
+Background image jobs (thumbnails and responsive derivatives)
+
+Jobs are stored in the database so their status can be queried from any
+worker. Once the enqueuing transaction commits the job is handed to a small
+in-process thread pool; ``manage.py process_thumbnail_jobs`` picks up
+anything that is still pending (e.g. after a restart or when the pool is
+disabled with ``THUMBNAIL_JOB_WORKERS = 0``), and queues again the jobs
+left running for more than ``THUMBNAIL_JOB_TIMEOUT`` seconds by a worker
+that died.
+
+A job records the name of the image it was queued for and saves nothing
+when another image was uploaded before it finished, the job of the newer
+upload makes the thumbnail then. Images are processed outside of any
+transaction, only the final check and save lock the row.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .eums import ThumbnailStatusEnum
+from .models import GroupProfile, ThumbnailJob, User
+
+logger = logging.getLogger("MainProcess")
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    workers = getattr(settings, "THUMBNAIL_JOB_WORKERS", 0)
+    if not workers:
+        return None
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="thumbnail"
+        )
+    return _executor
+
+
+def enqueue_image_job(instance, field_name):
+    """
+    Queue processing of ``instance.<field_name>`` (a ``User`` or a
+    ``GroupProfile``) and return the job
+    """
+    source = getattr(instance, field_name).name or ""
+    if isinstance(instance, User):
+        job = ThumbnailJob.objects.create(
+            user=instance, field=field_name, source=source
+        )
+    else:
+        job = ThumbnailJob.objects.create(
+            group_profile=instance, field=field_name, source=source
+        )
+    executor = get_executor()
+    if executor is not None:
+        transaction.on_commit(lambda: executor.submit(_run_in_thread, job.pk))
+    return job
+
+
+def _run_in_thread(job_id):
+    try:
+        run_thumbnail_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Superseded(Exception):
+    """
+    The image of a job was replaced before the job wrote its results
+    """
+
+
+def check_source(job, target, lock=False):
+    """
+    Raise ``Superseded`` when ``target`` no longer stores the image ``job``
+    was queued for. ``lock`` keeps the row locked until the transaction ends
+    so that no upload lands between the check and the commit.
+    """
+    if job.source is None:
+        return
+    queryset = type(target)._base_manager.filter(pk=target.pk)
+    if lock:
+        queryset = queryset.select_for_update()
+    current = queryset.values_list(job.field, flat=True).first()
+    if (current or "") != job.source:
+        raise Superseded(job.source)
+
+
+def run_thumbnail_job(job_id):
+    """
+    Claim a pending job and process its image. Returns False when the job
+    was already claimed by another worker.
+    """
+    claimed = ThumbnailJob.objects.filter(
+        pk=job_id, status=ThumbnailStatusEnum.PENDING.value
+    ).update(status=ThumbnailStatusEnum.RUNNING.value, date_modified=timezone.now())
+    if not claimed:
+        return False
+
+    job = ThumbnailJob.objects.get(pk=job_id)
+    try:
+        if job.user_id:
+            target = User._base_manager.get(pk=job.user_id)
+        else:
+            target = GroupProfile._base_manager.get(pk=job.group_profile_id)
+        check_source(job, target)
+        # Decoded and stored with no row locked. The files are recorded
+        # against the source upload (MediaBlob.derived), a skipped job
+        # leaves them to the next one for the same image.
+        fields = target.process_image(job.field, save=False)
+        with transaction.atomic():
+            # No upload lands between this check and the save
+            check_source(job, target, lock=True)
+            target.save(update_fields=fields)
+    except Superseded:
+        job.status = ThumbnailStatusEnum.SKIPPED.value
+    except Exception as e:
+        logger.exception("Thumbnail job %s failed", job_id)
+        job.status = ThumbnailStatusEnum.FAILED.value
+        job.error = str(e)
+    else:
+        job.status = ThumbnailStatusEnum.DONE.value
+    job.save(update_fields=["status", "error", "date_modified"])
+    return True
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    Queue again the jobs running for more than ``timeout`` seconds,
+    ``THUMBNAIL_JOB_TIMEOUT`` by default. Returns their number.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "THUMBNAIL_JOB_TIMEOUT", 600)
+    now = timezone.now()
+    return ThumbnailJob.objects.filter(
+        status=ThumbnailStatusEnum.RUNNING.value,
+        date_modified__lt=now - timedelta(seconds=timeout),
+    ).update(status=ThumbnailStatusEnum.PENDING.value, date_modified=now)
+
+
+def process_pending_jobs(limit=None):
+    """
+    Run pending jobs oldest first, stale running ones included, returns the
+    number processed
+    """
+    requeue_stale_jobs()
+    job_ids = (
+        ThumbnailJob.objects.filter(status=ThumbnailStatusEnum.PENDING.value)
+        .order_by("date_created")
+        .values_list("pk", flat=True)
+    )
+    if limit:
+        job_ids = job_ids[:limit]
+    return sum(1 for job_id in list(job_ids) if run_thumbnail_job(job_id))
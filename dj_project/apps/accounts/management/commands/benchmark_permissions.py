@@ -0,0 +1,78 @@
+import statistics
+import time
+from django.contrib.auth.models import Group, Permission
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.accounts.cache import prime_permission_cache
+from apps.accounts.models import User
+
+USERNAME = "benchmark-permissions"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the permission check AccountPermission makes on each "
+        "request, with the permission set read from the cache, or with "
+        "--uncached as before, from the database. Prints p50, p95 and p99 "
+        "in milliseconds and the queries per check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--groups", type=int, default=5, help="Groups the user belongs to"
+        )
+        parser.add_argument(
+            "--uncached",
+            action="store_true",
+            help="Let ModelBackend query the permissions on each check",
+        )
+
+    def handle(self, *args, **options):
+        user, _ = User._base_manager.get_or_create(
+            username=USERNAME, defaults={"email": f"{USERNAME}@example.com"}
+        )
+        permissions = list(Permission.objects.order_by("pk")[:50])
+        groups = []
+        for number in range(options["groups"]):
+            group, _ = Group.objects.get_or_create(name=f"{USERNAME}-{number}")
+            group.permissions.set(permissions[number :: options["groups"]])
+            groups.append(group)
+        user.groups.set(groups)
+        perms = [
+            f"{permission.content_type.app_label}.{permission.codename}"
+            for permission in permissions[:3]
+        ]
+
+        timings, queries = [], 0
+        try:
+            for _ in range(options["requests"]):
+                # A new user object per request, as the session middleware
+                # loads it
+                current = User._base_manager.get(pk=user.pk)
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    if not options["uncached"]:
+                        prime_permission_cache(current)
+                    if not current.has_perms(perms):
+                        self.stderr.write("Permission check failed")
+                        break
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries += len(captured)
+        finally:
+            user.delete()
+            for group in groups:
+                group.delete()
+        self.report(timings, queries, "uncached" if options["uncached"] else "cached")
+
+    def report(self, timings, queries, mode):
+        if len(timings) < 2:
+            self.stdout.write(f"{mode}: {timings} ms")
+            return
+        cuts = statistics.quantiles(timings, n=100, method="inclusive")
+        self.stdout.write(
+            f"{mode}: {len(timings)} requests, p50 {cuts[49]:.1f} ms, "
+            f"p95 {cuts[94]:.1f} ms, p99 {cuts[98]:.1f} ms, "
+            f"{queries / len(timings):.2f} queries per check"
+        )
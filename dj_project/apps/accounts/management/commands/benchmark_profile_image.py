@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+from io import BytesIO
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from PIL import Image
+from apps.accounts.jobs import process_pending_jobs, run_thumbnail_job
+from apps.accounts.models import User
+from core.date import convert_to_string
+from core.media_helper import release_upload
+
+USERNAME = "benchmark-profile-image"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the latency of /accounts/update_profile_image/ with the "
+        "thumbnail made in the background, or with --inline as before, in "
+        "the request. Prints p50, p95 and p99 in milliseconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument(
+            "--size", type=int, default=3000, help="Width and height of the photos"
+        )
+        parser.add_argument(
+            "--inline",
+            action="store_true",
+            help="Count the thumbnail job in each request",
+        )
+
+    def handle(self, *args, **options):
+        user, _ = User._base_manager.get_or_create(
+            username=USERNAME, defaults={"email": f"{USERNAME}@example.com"}
+        )
+        client = Client()
+        client.force_login(user)
+        url = reverse("update_profile_image")
+        timings = []
+        # Jobs are run here, not by the pool, so that they do not compete
+        # with the requests measured
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            THUMBNAIL_JOB_WORKERS=0,
+        ):
+            for number in range(options["requests"]):
+                # A new photo each time, known uploads reuse their thumbnail,
+                # also across runs
+                photo = self.get_photo(number, options["size"])
+                user.refresh_from_db()
+                data = {
+                    "last_updated": convert_to_string(user.last_updated),
+                    "profile_image": photo,
+                }
+                start = time.perf_counter()
+                response = client.post(url, data)
+                if response.status_code != 200:
+                    self.stderr.write(response.content.decode())
+                    break
+                if options["inline"]:
+                    run_thumbnail_job(response.json()["data"]["thumbnail_job"])
+                timings.append((time.perf_counter() - start) * 1000)
+            if not options["inline"]:
+                process_pending_jobs()
+
+        user.refresh_from_db()
+        release_upload(user.profile_picture.name)
+        user.delete()
+        self.report(timings, "inline" if options["inline"] else "queued")
+
+    def get_photo(self, number, size):
+        color = tuple(random.randrange(256) for _ in range(3))
+        image = Image.new("RGB", (size, size), color)
+        photo = BytesIO()
+        image.save(photo, "JPEG", quality=90)
+        photo.seek(0)
+        photo.name = f"photo{number}.jpg"
+        return photo
+
+    def report(self, timings, mode):
+        if len(timings) < 2:
+            self.stdout.write(f"{mode}: {timings} ms")
+            return
+        cuts = statistics.quantiles(timings, n=100, method="inclusive")
+        self.stdout.write(
+            f"{mode}: {len(timings)} requests, p50 {cuts[49]:.1f} ms, "
+            f"p95 {cuts[94]:.1f} ms, p99 {cuts[98]:.1f} ms, "
+            f"max {max(timings):.1f} ms"
+        )
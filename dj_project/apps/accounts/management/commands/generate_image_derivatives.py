@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from apps.accounts.models import GroupProfile, User
+
+IMAGE_FIELDS = [
+    (User, ["profile_picture", "cover"]),
+    (GroupProfile, ["image"]),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate missing responsive image derivatives and report the bytes "
+        "saved against serving the originals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--width",
+            type=int,
+            default=320,
+            help="Display width used to pick the derivative in the report",
+        )
+        parser.add_argument(
+            "--report-only",
+            action="store_true",
+            help="Only report on derivatives that already exist",
+        )
+
+    def handle(self, *args, **options):
+        original_total = 0
+        derivative_totals = {}
+        for model, field_names in IMAGE_FIELDS:
+            for instance in model._base_manager.all().iterator():
+                for field_name in field_names:
+                    image = getattr(instance, field_name)
+                    if not image:
+                        continue
+                    try:
+                        if not options["report_only"]:
+                            instance.create_derivatives(field_name)
+                        original_size = image.storage.size(image.name)
+                    except Exception as e:
+                        self.stderr.write(f"{image.name}: {e}")
+                        continue
+
+                    entry = instance.image_derivatives.get(field_name)
+                    if not entry or entry.get("source") != image.name:
+                        continue
+                    original_total += original_size
+                    for image_format, names in entry["formats"].items():
+                        name = self.pick(names, options["width"])
+                        derivative_totals[image_format] = derivative_totals.get(
+                            image_format, 0
+                        ) + image.storage.size(name)
+
+        self.stdout.write(f"original: {original_total} bytes")
+        for image_format, total in derivative_totals.items():
+            saved = 100 - (total * 100 / original_total) if original_total else 0
+            self.stdout.write(
+                f"{image_format} @ {options['width']}w: {total} bytes ({saved:.1f}% saved)"
+            )
+
+    def pick(self, names, width):
+        """Smallest derivative at least ``width`` wide, else the largest"""
+        widths = sorted(int(key) for key in names)
+        chosen = next((key for key in widths if key >= width), widths[-1])
+        return names[str(chosen)]
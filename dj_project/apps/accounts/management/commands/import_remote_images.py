@@ -0,0 +1,121 @@
+import json
+import sys
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from apps.accounts.bulk import chunked, get_existing, get_lookup
+from apps.accounts.models import GroupProfile
+from core.remote_images import BATCH_SIZE, ingest_images
+from core.streaming import CSV, NDJSON, parse_rows
+
+DEFAULT_FIELDS = {"user": "profile_picture", "group": "image"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Download images from remote urls into user or group image fields. "
+        "Prints one NDJSON result per row, then a summary."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help=(
+                "NDJSON, or CSV when it ends with .csv, with an id (or username, "
+                "or group name) and a url per row; - reads NDJSON from stdin"
+            ),
+        )
+        parser.add_argument("--model", choices=list(DEFAULT_FIELDS), default="user")
+        parser.add_argument(
+            "--field", help="Image field, profile_picture or image by default"
+        )
+        parser.add_argument("--concurrency", type=int)
+        parser.add_argument(
+            "--no-queue",
+            action="store_true",
+            help="Do not queue the jobs making the responsive derivatives",
+        )
+
+    def handle(self, *args, **options):
+        summary = {"ok": 0, "error": 0}
+        if options["path"] == "-":
+            self.run(parse_rows(sys.stdin), options, summary)
+        else:
+            content_type = CSV if options["path"].endswith(".csv") else NDJSON
+            with open(options["path"], encoding="utf-8-sig", newline="") as file:
+                self.run(parse_rows(file, content_type), options, summary)
+        self.write({"summary": summary})
+
+    def run(self, rows, options, summary):
+        model = options["model"]
+        field_name = options["field"] or DEFAULT_FIELDS[model]
+        targets = self.get_targets(rows, model, field_name, summary)
+        results = ingest_images(
+            targets, options["concurrency"], queue=not options["no_queue"]
+        )
+        for result in results:
+            summary[result["status"]] += 1
+            self.write(result)
+
+    def write(self, result):
+        self.stdout.write(json.dumps(result))
+
+    def error(self, summary, number, error):
+        summary["error"] += 1
+        self.write({"row": number, "status": "error", "error": error})
+
+    def get_targets(self, rows, model, field_name, summary):
+        """
+        ``(instance, field_name, url)`` of the rows, looked up ``BATCH_SIZE``
+        rows at a time. Rows that name nothing are reported right away.
+        """
+        for chunk in chunked(rows, BATCH_SIZE):
+            lookups = {}
+            for number, row, error in chunk:
+                if error is None:
+                    lookup = self.get_lookup(row, model)
+                    if lookup is None:
+                        error = "An id or name is required"
+                    elif not row.get("url"):
+                        error = "A url is required"
+                if error is not None:
+                    self.error(summary, number, error)
+                    continue
+                lookups[number] = (lookup, row["url"])
+
+            if model == "group":
+                existing = self.get_groups([lookup for lookup, _ in lookups.values()])
+            else:
+                existing = get_existing([lookup for lookup, _ in lookups.values()])
+            for number, (lookup, url) in lookups.items():
+                instance = existing.get(lookup)
+                if instance is None:
+                    self.error(summary, number, "Not found")
+                    continue
+                yield instance, field_name, url
+
+    def get_lookup(self, row, model):
+        """
+        ``("id", pk)``, or ``("username", name)`` for users and
+        ``("name", name)`` for groups
+        """
+        if model == "user":
+            return get_lookup(row)
+        lookup = get_lookup({"id": row.get("id"), "username": row.get("name")})
+        if lookup is not None and lookup[0] == "username":
+            return "name", lookup[1]
+        return lookup
+
+    def get_groups(self, lookups):
+        """
+        ``{("id", pk): profile, ("name", name): profile}``, creating the
+        missing profiles
+        """
+        ids = {value for key, value in lookups if key == "id"}
+        names = {value for key, value in lookups if key == "name"}
+        existing = {}
+        for group in Group.objects.filter(Q(pk__in=ids) | Q(name__in=names)):
+            profile, _ = GroupProfile._base_manager.get_or_create(group=group)
+            existing[("id", group.pk)] = profile
+            existing[("name", group.name)] = profile
+        return existing
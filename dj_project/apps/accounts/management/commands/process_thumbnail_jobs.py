@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.accounts.jobs import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Process pending thumbnail jobs, polling the queue unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true")
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--interval", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_jobs(limit=options["limit"])
+            if processed:
+                self.stdout.write(f"Processed {processed} thumbnail job(s)")
+            if options["once"]:
+                return
+            if not processed:
+                time.sleep(options["interval"])
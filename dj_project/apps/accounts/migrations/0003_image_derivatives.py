@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_thumbnailjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="groupprofile",
+            name="image_derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="thumbnailjob",
+            name="field",
+            field=models.CharField(default="profile_picture", max_length=50),
+        ),
+        migrations.AddField(
+            model_name="thumbnailjob",
+            name="group_profile",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="thumbnail_jobs",
+                to="accounts.groupprofile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="image_derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name="thumbnailjob",
+            name="user",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="thumbnail_jobs",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -10,8 +10,9 @@ from django.contrib.auth.models import (
 from django.utils.translation import gettext_lazy as _
 from django.db import models
 from django.conf import settings
-from core.helper import create_thumbnail
-from .eums import ThemeEnum
+from core.helper import create_image_derivatives, create_thumbnail
+from core.models import SnapshotModelMixin
+from .eums import ThemeEnum, ThumbnailStatusEnum
 
 
 class GroupProfileManager(GroupManager):
@@ -26,9 +27,24 @@ class GroupProfile(models.Model):
         Group, on_delete=models.CASCADE, primary_key=True, related_name="profile"
     )
     image = models.ImageField(upload_to="groups/", blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True)
     is_active = models.BooleanField(default=True)
     objects = GroupProfileManager()
 
+    def create_derivatives(self, field_name="image", save=True):
+        create_image_derivatives(getattr(self, field_name), field_name, self, save)
+
+    def process_image(self, field_name="image", save=True):
+        """Returns the names of the fields set"""
+        self.create_derivatives(field_name, save)
+        return ["image_derivatives"]
+
+    def queue_image_job(self, field_name="image"):
+        """Create the image derivatives in the background"""
+        from .jobs import enqueue_image_job
+
+        return enqueue_image_job(self, field_name)
+
 
 class AccountManager(UserManager):
 
@@ -37,7 +53,7 @@ class AccountManager(UserManager):
         return queryset.filter(is_active=True)
 
 
-class User(AbstractUser):
+class User(SnapshotModelMixin, AbstractUser):
     profile_picture = models.ImageField(
         upload_to="profile_pics/", blank=True, null=True
     )
@@ -68,6 +84,7 @@ class User(AbstractUser):
     )
     is_deleted = models.BooleanField(default=False)
     last_updated = models.DateTimeField(auto_now=True)
+    image_derivatives = models.JSONField(default=dict, blank=True)
     editable_fields = [
         "first_name",
         "last_name",
@@ -75,6 +92,16 @@ class User(AbstractUser):
         "profile_picture",
         "theme_mode",
     ]
+    # Left out of UserChangeHistory: derived data, the password hash and
+    # the login time written by every login
+    untracked_fields = [
+        "image_derivatives",
+        "password",
+        "last_login",
+    ]
+    # Thumbnail field, and its storage path, made from an image field. See
+    # create_thumbnail and core.remote_images
+    thumbnail_fields = {"profile_picture": ("thumbnail", "thumbnails")}
 
     @property
     def profile_image(self):
@@ -89,8 +116,40 @@ class User(AbstractUser):
         self.profile_picture = val
         return
 
-    def create_thumbnail(self):
-        create_thumbnail(self.profile_picture, "thumbnail", self, "thumbnails")
+    def get_tracked_changes(self, fields=None):
+        """
+        ``get_changed_fields`` without the ``untracked_fields``, what goes
+        into UserChangeHistory for single and bulk saves alike
+        """
+        changes = self.get_changed_fields(fields)
+        for field_name in self.untracked_fields:
+            changes.pop(field_name, None)
+        return changes
+
+    def create_thumbnail(self, save=True):
+        thumbnail_field, path = self.thumbnail_fields["profile_picture"]
+        create_thumbnail(self.profile_picture, thumbnail_field, self, path, save=save)
+
+    def create_derivatives(self, field_name, save=True):
+        create_image_derivatives(getattr(self, field_name), field_name, self, save)
+
+    def process_image(self, field_name, save=True):
+        """Returns the names of the fields set"""
+        fields = ["image_derivatives"]
+        if field_name == "profile_picture":
+            self.create_thumbnail(save)
+            fields.append(self.thumbnail_fields[field_name][0])
+        self.create_derivatives(field_name, save)
+        return fields
+
+    def queue_image_job(self, field_name):
+        """Process the image in the background, returns the queued job"""
+        from .jobs import enqueue_image_job
+
+        return enqueue_image_job(self, field_name)
+
+    def queue_thumbnail(self):
+        return self.queue_image_job("profile_picture")
 
     def notification_count(self):
         return self.history_notification.filter(is_read=False).count()
@@ -114,3 +173,41 @@ class UserChangeHistory(models.Model):
 
     def __str__(self):
         return f"Change in {self.field_changed} for {self.user.username} by {self.changed_by.username if self.changed_by else 'system'}"
+
+
+class ThumbnailJob(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="thumbnail_jobs",
+    )
+    group_profile = models.ForeignKey(
+        GroupProfile,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="thumbnail_jobs",
+    )
+    field = models.CharField(max_length=50, default="profile_picture")
+    # Name of the image to process, None for jobs queued before it was kept
+    source = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(
+        max_length=20,
+        default=ThumbnailStatusEnum.PENDING.value,
+        choices=[(status.value, status.name.title()) for status in ThumbnailStatusEnum],
+    )
+    error = models.TextField(null=True, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "date_created"])]
+
+    def __str__(self):
+        return f"Thumbnail job {self.pk} for {self.target} ({self.status})"
+
+    @property
+    def target(self):
+        return self.user if self.user_id else self.group_profile
@@ -1,30 +1,49 @@
-from django.db.models.signals import pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from .models import User, UserChangeHistory
+from .typeahead import update_user
 
 
 @receiver(pre_save, sender=User)
-def track_user_changes(sender, instance, **kwargs):
+def track_user_changes(sender, instance, update_fields=None, **kwargs):
+    instance.__dict__.pop("_pending_history", None)
     if instance.pk:  # Ensures this is an update, not a new instance
-        try:
-            old_user = User.objects.get(pk=instance.pk)
-        except User.DoesNotExist:
-            return  # If the user doesn't exist, skip
-
-        # Compare old and new values
-        for field in instance._meta.fields:
-            field_name = field.name
-            old_value = getattr(old_user, field_name, None)
-            new_value = getattr(instance, field_name, None)
-
-            if old_value != new_value:
-                # Save change history
-                UserChangeHistory.objects.create(
-                    user=instance,
-                    changed_by=getattr(
-                        instance, "_changed_by", None
-                    ),  # Optional: track who made the change
-                    field_changed=field_name,
-                    old_value=old_value,
-                    new_value=new_value,
-                )
+        # Compare the loaded snapshot with the new values, only for the
+        # fields that are actually being saved
+        changes = instance.get_tracked_changes(update_fields)
+        if not changes:
+            return
+
+        changed_by = getattr(
+            instance, "_changed_by", None
+        )  # Optional: track who made the change
+        history = [
+            UserChangeHistory(
+                user=instance,
+                changed_by=changed_by,
+                field_changed=field_name,
+                old_value=old_value,
+                new_value=new_value,
+            )
+            for field_name, (old_value, new_value) in changes.items()
+        ]
+        instance._pending_history = history
+
+
+@receiver(post_save, sender=User)
+def save_user_changes(sender, instance, update_fields=None, **kwargs):
+    history = instance.__dict__.pop("_pending_history", None)
+    if history:
+        transaction.on_commit(lambda: UserChangeHistory.objects.bulk_create(history))
+    instance.take_snapshot(update_fields)
+
+
+@receiver(post_save, sender=User)
+def update_typeahead_index(sender, instance, update_fields=None, **kwargs):
+    update_user(instance, update_fields)
+
+
+@receiver(post_delete, sender=User)
+def remove_from_typeahead_index(sender, instance, **kwargs):
+    update_user(instance, deleted=True)
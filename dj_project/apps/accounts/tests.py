@@ -1,3 +1,415 @@
-from django.test import TestCase
+import json
+import warnings
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, Permission, update_last_login
+from django.core.cache import CacheKeyWarning
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.utils import timezone
+from core.cache import VERSION_KEY, get_shared
+from core.media_helper import store_upload
+from core.models import MediaBlob
+from core.testing import APITestCase, TestCase, create_user, get_temp_dir
+from .api.serializer import GroupSerializer, UserEditSerializer
+from .eums import ThumbnailStatusEnum
+from .bulk import create_chunk, update_chunk
+from .cache import get_permission_set
+from .jobs import requeue_stale_jobs, run_thumbnail_job
+from .models import GroupProfile, ThumbnailJob, User, UserChangeHistory
+from . import typeahead
+
+
+class KeysetPaginationTests(APITestCase):
+    url = "/accounts/api/v2/users/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        User.objects.bulk_create(
+            User(username=f"user{i}", email=f"user{i}@example.com") for i in range(5)
+        )
+
+    def get_cursor(self, position):
+        return urlsafe_b64encode(json.dumps({"p": position}).encode()).decode()
+
+    def test_pages(self):
+        response = self.client.get(self.url, {"limit": 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 4)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
+
+    def test_count(self):
+        # Table statistics as on PostgreSQL and MySQL, which drift from the rows
+        with mock.patch("core.drf.pagination.estimate_count", return_value=100):
+            for count, expected in ((None, 6), ("estimate", 100), ("none", None)):
+                with self.subTest(count=count):
+                    params = {"count": count} if count else {}
+                    response = self.client.get(self.url, params)
+                    self.assertEqual(response.data["count"], expected)
+
+    def test_invalid_cursor(self):
+        for cursor in ("!!", self.get_cursor(["abc"]), self.get_cursor([None])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class CacheResponseTests(APITestCase):
+    url = "/accounts/api/v2/users/"
+
+    def test_long_url_key(self):
+        params = {"search": "x" * 300, "ordering": "-id"}
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            self.assertEqual(self.client.get(self.url, params).status_code, 200)
+            self.assertEqual(self.client.get(self.url, params).status_code, 200)
+
+    def test_query_order_shares_entry(self):
+        self.client.get(f"{self.url}?limit=2&ordering=-id")
+        with self.assertNumQueries(2):
+            # Session and user only, the page comes from the cache
+            self.client.get(f"{self.url}?ordering=-id&limit=2")
+
+
+class SyncM2MTests(TestCase):
+    """
+    The queries of an add and remove diff do not depend on its size
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.groups = [Group.objects.create(name=f"group{i}") for i in range(8)]
+        cls.permissions = list(Permission.objects.order_by("pk")[:8])
+        cls.user = create_user("member")
+
+    def get_ids(self, objects):
+        return [obj.pk for obj in objects]
+
+    def test_user_groups(self):
+        self.user.groups.set(self.groups[:3])
+        # Savepoints (4), update, stored ids, known ids, delete, insert
+        with self.assertNumQueries(9):
+            UserEditSerializer().update(
+                self.user, {"groups": self.get_ids(self.groups[2:4])}
+            )
+        self.assertEqual(
+            set(self.user.groups.values_list("pk", flat=True)),
+            set(self.get_ids(self.groups[2:4])),
+        )
+        with self.assertNumQueries(9):
+            UserEditSerializer().update(
+                self.user, {"groups": self.get_ids(self.groups[4:8])}
+            )
+        self.assertEqual(
+            set(self.user.groups.values_list("pk", flat=True)),
+            set(self.get_ids(self.groups[4:8])),
+        )
+
+    def test_group_permissions(self):
+        group = self.groups[0]
+        group.permissions.set(self.permissions[:3])
+        data = {"name": group.name, "permissions": self.get_ids(self.permissions[2:4])}
+        # Savepoints (2), stored ids, known ids, delete, insert
+        with self.assertNumQueries(6):
+            GroupSerializer().update(group, data)
+        self.assertEqual(
+            set(group.permissions.values_list("pk", flat=True)),
+            set(self.get_ids(self.permissions[2:4])),
+        )
+        data["permissions"] = self.get_ids(self.permissions[4:8])
+        with self.assertNumQueries(6):
+            GroupSerializer().update(group, data)
+        self.assertEqual(
+            set(group.permissions.values_list("pk", flat=True)),
+            set(self.get_ids(self.permissions[4:8])),
+        )
+
+
+class PermissionCacheTests(TestCase):
+    url = "/accounts/api/v2/users/export/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.permission = Permission.objects.get(codename="view_user")
+        cls.group = Group.objects.create(name="viewers")
+        cls.group.permissions.add(cls.permission)
+        cls.user = create_user("viewer")
+        cls.user.groups.add(cls.group)
+
+    def test_group_permission_removed(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        # Served from the cache now
+        with self.assertNumQueries(0):
+            self.assertEqual(get_permission_set(self.user), {"accounts.view_user"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.permissions.remove(self.permission)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ListQueryBudgetTests(APITestCase):
+    """
+    Nested groups, profiles, permissions and members are prefetched, the
+    queries of a page do not grow with its rows
+    """
+
+    # Session, user, count, page and one query per prefetched relation
+    budgets = {"users": 5, "profile": 7, "user-group": 4}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        permissions = list(Permission.objects.order_by("pk")[:4])
+        for i in range(10):
+            group = Group.objects.create(name=f"team{i}")
+            GroupProfile._base_manager.create(group=group)
+            group.permissions.set(permissions)
+            user = create_user(f"user{i}")
+            user.groups.add(group)
+
+    def test_list_budgets(self):
+        for name, budget in self.budgets.items():
+            with self.subTest(endpoint=name), self.assertNumQueries(budget):
+                response = self.client.get(f"/accounts/api/v2/{name}/")
+                self.assertEqual(response.status_code, 200)
+
+
+class GroupMembersTests(APITestCase):
+    """
+    Inactive users are left out of the members in every mode
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.group = Group.objects.create(name="team")
+        GroupProfile._base_manager.create(group=cls.group)
+        cls.member = create_user("member")
+        cls.member.groups.add(cls.group)
+        create_user("former", is_active=False).groups.add(cls.group)
+        empty = Group.objects.create(name="empty")
+        GroupProfile._base_manager.create(group=empty)
+
+    def get_members(self, mode):
+        response = self.client.get(
+            f"/accounts/api/v2/groups/{self.group.pk}/", {"members": mode}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["members"]
+
+    def test_modes(self):
+        self.assertEqual(self.get_members("count"), 1)
+        self.assertEqual(self.get_members("ids"), [self.member.pk])
+        self.assertEqual(
+            [member["id"] for member in self.get_members("full")], [self.member.pk]
+        )
+
+    def test_count_list(self):
+        response = self.client.get("/accounts/api/v2/groups/", {"members": "count"})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        counts = {group["name"]: group["members"] for group in results}
+        self.assertEqual(counts, {"team": 1, "empty": 0})
+
+
+class ThumbnailJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(
+            "photo",
+            profile_picture="profile_pics/old.jpg",
+            thumbnail="thumbnails/old.jpg",
+        )
+
+    def upload(self, name):
+        """
+        Save ``name`` as the picture from another request
+        """
+        User._base_manager.filter(pk=self.user.pk).update(profile_picture=name)
+
+    def assertStatus(self, job, status):
+        job.refresh_from_db()
+        self.assertEqual(job.status, status.value)
+
+    def test_source(self):
+        job = self.user.queue_thumbnail()
+        self.assertEqual(job.source, "profile_pics/old.jpg")
+
+    def test_replaced_before_run(self):
+        job = self.user.queue_thumbnail()
+        self.upload("profile_pics/new.jpg")
+        with mock.patch.object(User, "process_image") as process_image:
+            self.assertTrue(run_thumbnail_job(job.pk))
+        process_image.assert_not_called()
+        self.assertStatus(job, ThumbnailStatusEnum.SKIPPED)
+
+    def test_replaced_while_running(self):
+        job = self.user.queue_thumbnail()
+
+        depth = len(connection.atomic_blocks)
+
+        def process_image(target, field_name, save=True):
+            # Not in a transaction of its own, nothing is locked
+            self.assertEqual(len(connection.atomic_blocks), depth)
+            target.thumbnail = "thumbnails/stale.jpg"
+            self.upload("profile_pics/new.jpg")
+            return ["thumbnail"]
+
+        with mock.patch.object(User, "process_image", process_image):
+            self.assertTrue(run_thumbnail_job(job.pk))
+        self.assertStatus(job, ThumbnailStatusEnum.SKIPPED)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.thumbnail.name, "thumbnails/old.jpg")
+
+    def test_done(self):
+        job = self.user.queue_thumbnail()
+        with mock.patch.object(
+            User, "process_image", return_value=["thumbnail"]
+        ) as process_image:
+            run_thumbnail_job(job.pk)
+        process_image.assert_called_once_with("profile_picture", save=False)
+        self.assertStatus(job, ThumbnailStatusEnum.DONE)
+
+    def test_requeue_stale(self):
+        stale, running = (self.user.queue_thumbnail() for _ in range(2))
+        ThumbnailJob.objects.filter(pk=stale.pk).update(
+            status=ThumbnailStatusEnum.RUNNING.value,
+            date_modified=timezone.now() - timedelta(minutes=20),
+        )
+        ThumbnailJob.objects.filter(pk=running.pk).update(
+            status=ThumbnailStatusEnum.RUNNING.value, date_modified=timezone.now()
+        )
+        self.assertEqual(requeue_stale_jobs(timeout=600), 1)
+        self.assertStatus(stale, ThumbnailStatusEnum.PENDING)
+        self.assertStatus(running, ThumbnailStatusEnum.RUNNING)
+
+
+class CreateThumbnailTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(MEDIA_ROOT=get_temp_dir(self)))
+
+    def test_failure(self):
+        user = create_user("photo", thumbnail="thumbnails/old.jpg")
+        user.profile_picture = store_upload(
+            ContentFile(b"not an image", name="photo.jpg"), "profile_pics/"
+        )
+        user.save()
+        with self.assertLogs("MainProcess", "ERROR"):
+            user.create_thumbnail()
+        user.refresh_from_db()
+        self.assertFalse(user.thumbnail)
+
+
+class ProfileImageRemovalTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(MEDIA_ROOT=get_temp_dir(self)))
+
+    def test_null_releases_upload(self):
+        user = create_user("photo")
+        user.profile_picture = store_upload(
+            ContentFile(b"photo", name="photo.jpg"), "profile_pics/"
+        )
+        user.save()
+        data = {"username": "photo", "email": "photo@example.com"}
+        response = self.client.put(
+            f"/accounts/api/v2/users/{user.pk}/",
+            encode_multipart(BOUNDARY, {**data, "profile_image": "null"}),
+            content_type=MULTIPART_CONTENT,
+        )
+        self.assertEqual(response.status_code, 201)
+        user.refresh_from_db()
+        self.assertFalse(user.profile_picture)
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 0)
+
+
+class TypeaheadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("member")
+
+    def search(self, prefix):
+        return [username for _, username, _ in typeahead.search_users(prefix, 10)]
+
+    def save_elsewhere(self, user):
+        """
+        Save ``user`` as another worker would, leaving this index behind
+        """
+        with mock.patch.object(typeahead, "_index", None):
+            user.save()
+
+    def test_changes_applied(self):
+        self.assertEqual(self.search("mem"), ["member"])
+        self.save_elsewhere(User(username="memo", email="memo@example.com"))
+        self.user.is_active = False
+        self.save_elsewhere(self.user)
+        # From the shared log, not the database
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search("mem"), ["memo"])
+
+    def test_too_far_behind(self):
+        self.assertEqual(self.search("mem"), ["member"])
+        self.save_elsewhere(User(username="memo", email="memo@example.com"))
+        with mock.patch.object(typeahead, "MAX_CHANGES", 0), self.assertNumQueries(1):
+            self.assertEqual(self.search("mem"), ["member", "memo"])
+
+
+class ChangeHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("member")
+
+    def test_tracked_field(self):
+        user = User._base_manager.get(pk=self.user.pk)
+        user.first_name = "Ann"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(
+            list(UserChangeHistory.objects.values_list("field_changed", "new_value")),
+            [("first_name", "Ann")],
+        )
+
+    def test_password_and_login(self):
+        user = User._base_manager.get(pk=self.user.pk)
+        user.set_password("a new password")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+            update_last_login(None, user)
+        self.assertFalse(UserChangeHistory.objects.exists())
+
+    def test_bulk_update(self):
+        data = {"id": self.user.pk, "first_name": "Ann", "password": "Xy7!pq9#Lm"}
+        rows = [(1, data)]
+        with self.captureOnCommitCallbacks(execute=True):
+            results = update_chunk(rows)
+        self.assertEqual(results[0]["status"], "ok")
+        self.assertEqual(
+            list(UserChangeHistory.objects.values_list("field_changed", flat=True)),
+            ["first_name"],
+        )
+
+
+class BulkCreateTests(TestCase):
+    def test_ids_without_returning_rows(self):
+        rows = [(number, {"username": f"bulk{number}"}) for number in (1, 2)]
+        # As on MySQL, where bulk_create leaves the ids unset
+        with mock.patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", False
+        ), self.captureOnCommitCallbacks(execute=True):
+            results = create_chunk(rows)
+        ids = dict(User._base_manager.values_list("username", "pk"))
+        self.assertEqual(
+            [result["id"] for result in results], [ids["bulk1"], ids["bulk2"]]
+        )
+        for pk in ids.values():
+            key = VERSION_KEY.format(label=f"accounts.user:{pk}")
+            self.assertIsNotNone(get_shared().get(key))
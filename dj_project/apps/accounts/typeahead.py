@@ -0,0 +1,210 @@
+"""
+In-process prefix index for the user typeahead
+
+Lower-cased usernames and emails of active users are kept in one sorted
+list, so a prefix lookup is a binary search followed by a short scan and
+never reaches the database. Each worker builds the index once and then
+follows a change log kept in the shared cache (see ``core.cache``): every
+saved or deleted user appends its new entry under the next number of
+``SEQUENCE_KEY`` and workers apply the entries they have not seen yet on
+their next lookup. A worker rebuilds only when it fell more than
+``MAX_CHANGES`` behind, or when entries expired or the log restarted.
+"""
+
+import threading
+from bisect import bisect_left, insort
+
+from core.cache import VERSION_KEY, bump_version, get_shared, get_versions
+from .models import User
+
+# Version of the log, changed when its sequence starts over
+TYPEAHEAD_VERSION = "accounts.typeahead"
+SEQUENCE_KEY = "typeahead:sequence"
+CHANGE_KEY = "typeahead:change:{}:{}"
+CHANGE_TIMEOUT = 60 * 60 * 24
+MAX_CHANGES = 1000
+INDEXED_FIELDS = {"username", "email", "thumbnail", "is_active"}
+
+
+class PrefixIndex:
+    """
+    Sorted ``(key, user_id)`` pairs plus ``user_id -> (username, email,
+    thumbnail)``
+    """
+
+    def __init__(self, rows=()):
+        self.users = {
+            user_id: (username, email, thumbnail)
+            for user_id, username, email, thumbnail in rows
+        }
+        self.keys = sorted(
+            pair
+            for user_id, (username, email, _) in self.users.items()
+            for pair in self.get_pairs(user_id, username, email)
+        )
+
+    @staticmethod
+    def get_pairs(user_id, username, email):
+        return [(key.lower(), user_id) for key in {username, email} if key]
+
+    def add(self, user_id, username, email, thumbnail):
+        self.remove(user_id)
+        self.users[user_id] = (username, email, thumbnail)
+        for pair in self.get_pairs(user_id, username, email):
+            insort(self.keys, pair)
+
+    def apply(self, changes):
+        for user_id, entry in changes:
+            if entry is None:
+                self.remove(user_id)
+            else:
+                self.add(user_id, *entry)
+
+    def remove(self, user_id):
+        entry = self.users.pop(user_id, None)
+        if entry is None:
+            return
+        for pair in self.get_pairs(user_id, entry[0], entry[1]):
+            index = bisect_left(self.keys, pair)
+            if index < len(self.keys) and self.keys[index] == pair:
+                del self.keys[index]
+
+    def search(self, prefix, limit):
+        """
+        ``[(user_id, username, thumbnail)]`` for up to ``limit`` users whose
+        username or email starts with ``prefix``, in key order
+        """
+        prefix = prefix.lower()
+        index = bisect_left(self.keys, (prefix,))
+        found = {}
+        while index < len(self.keys) and len(found) < limit:
+            key, user_id = self.keys[index]
+            if not key.startswith(prefix):
+                break
+            if user_id not in found:
+                username, _, thumbnail = self.users[user_id]
+                found[user_id] = (user_id, username, thumbnail)
+            index += 1
+        return list(found.values())
+
+
+_lock = threading.Lock()
+_index = None
+# (log version, last change applied) of _index
+_state = None
+
+
+def start_log():
+    """
+    ``(version, sequence)`` of a new log, on first use or after its keys
+    were evicted. Workers that followed the previous one rebuild.
+    """
+    shared = get_shared()
+    if shared.add(SEQUENCE_KEY, 0, None):
+        return bump_version(TYPEAHEAD_VERSION), 0
+    # Started by another worker meanwhile
+    (version,) = get_versions(TYPEAHEAD_VERSION)
+    return version, shared.get(SEQUENCE_KEY, 0)
+
+
+def get_state():
+    """
+    ``(version, sequence)`` of the shared log, with one cache call
+    """
+    version_key = VERSION_KEY.format(label=TYPEAHEAD_VERSION)
+    found = get_shared().get_many([version_key, SEQUENCE_KEY])
+    if len(found) < 2:
+        return start_log()
+    return found[version_key], found[SEQUENCE_KEY]
+
+
+def get_changes(state, version, sequence):
+    """
+    The changes logged since ``state``, None when they cannot all be read
+    """
+    seen_version, seen = state
+    if seen_version != version or not 0 < sequence - seen <= MAX_CHANGES:
+        return None
+    keys = [
+        CHANGE_KEY.format(version, number) for number in range(seen + 1, sequence + 1)
+    ]
+    found = get_shared().get_many(keys)
+    if len(found) < len(keys):
+        return None
+    return [found[key] for key in keys]
+
+
+def get_index():
+    global _index, _state
+    version, sequence = get_state()
+    with _lock:
+        if _index is not None and _state != (version, sequence):
+            changes = get_changes(_state, version, sequence)
+            if changes is None:
+                _index = None
+            else:
+                _index.apply(changes)
+                _state = (version, sequence)
+        if _index is None:
+            _index = PrefixIndex(
+                User.objects.values_list("id", "username", "email", "thumbnail")
+            )
+            _state = (version, sequence)
+        return _index
+
+
+def search_users(prefix, limit):
+    index = get_index()
+    with _lock:
+        return index.search(prefix, limit)
+
+
+def get_change(user, deleted=False):
+    if deleted or not user.is_active:
+        return (user.pk, None)
+    return (user.pk, (user.username, user.email, user.thumbnail.name))
+
+
+def publish(changes):
+    """
+    Append ``changes`` to the shared log and apply them to the index of
+    this worker when it is up to date
+    """
+    global _state
+    shared = get_shared()
+    version, _ = get_state()
+    try:
+        sequence = shared.incr(SEQUENCE_KEY, len(changes))
+    except ValueError:
+        # Evicted since get_state
+        version, _ = start_log()
+        sequence = shared.incr(SEQUENCE_KEY, len(changes))
+    first = sequence - len(changes) + 1
+    shared.set_many(
+        {
+            CHANGE_KEY.format(version, first + offset): change
+            for offset, change in enumerate(changes)
+        },
+        CHANGE_TIMEOUT,
+    )
+    with _lock:
+        if _index is not None and _state == (version, first - 1):
+            _index.apply(changes)
+            _state = (version, sequence)
+
+
+def update_user(user, update_fields=None, deleted=False):
+    """
+    Reflect a saved or deleted user in the index of every worker
+    """
+    if update_fields and not INDEXED_FIELDS & set(update_fields):
+        return
+    publish([get_change(user, deleted)])
+
+
+def update_users(users):
+    """
+    ``update_user`` for users written in bulk
+    """
+    if users:
+        publish([get_change(user) for user in users])
@@ -9,6 +9,7 @@ from .views import (
     signup,
     update_profile,
     update_profile_image,
+    thumbnail_job_status,
 )
 from .router import router
 
@@ -25,6 +26,11 @@ urlpatterns = [
     path("forgot_password/", forgot_password, name="forgot_password"),
     path("update_profile/", update_profile, name="update_profile"),
     path("update_profile_image/", update_profile_image, name="update_profile_image"),
+    path(
+        "thumbnail_jobs/<int:job_id>/",
+        thumbnail_job_status,
+        name="thumbnail_job_status",
+    ),
     path(
         "validate_password_reset_request/",
         validate_password_reset_request,
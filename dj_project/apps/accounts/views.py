@@ -2,24 +2,28 @@
 Accounts Model views
 """
 
+import hashlib
 import json
 import logging
 
 from django.contrib.auth import authenticate, login, logout, password_validation
 from django.core.validators import validate_email
 from django.forms import ValidationError
-from django.http import JsonResponse
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 
-from .models import User
-from core.helper import is_token_valid, decode_uid
+from .models import ThumbnailJob, User
+from core.helper import is_token_valid, decode_uid, get_srcset
 from core.date import convert_to_string
+from core.media_helper import release_upload, store_upload
 
-from .api.serializer import UserSerializer
+from .cache import get_session_profile
 from .notification import send_password_reset_email
 from .forms import SignUpForm, LoginForm
-from .eums import ThemeEnum
+from .eums import ThemeEnum, ThumbnailStatusEnum
 
 logger = logging.getLogger("MainProcess")
 
@@ -91,16 +95,15 @@ def session_update(request):
     Functions that check if user is session is still valid
     """
     if request.method == "GET":
-        logger.info("cookies here.......%s", request.COOKIES)
         if request.user.is_authenticated:
-            user_data = UserSerializer(request.user)
+            user_data = get_session_profile(request.user)
             profile = {
-                **user_data.data,
-                "cover": request.build_absolute_uri(user_data.data.get("cover")),
-                "profile_image": request.build_absolute_uri(user_data.data.get("profile_image")),
-                "thumbnail": request.build_absolute_uri(user_data.data.get("thumbnail")),
+                **user_data,
+                "cover": request.build_absolute_uri(user_data.get("cover")),
+                "profile_image": request.build_absolute_uri(user_data.get("profile_image")),
+                "thumbnail": request.build_absolute_uri(user_data.get("thumbnail")),
             }
-            return JsonResponse(
+            response = JsonResponse(
                 {
                     "status": "success",
                     "msg": "Login successful",
@@ -111,6 +114,13 @@ def session_update(request):
                 },
                 status=200,
             )
+            etag = quote_etag(hashlib.md5(response.content).hexdigest())
+            if etag in parse_etags(request.headers.get("If-None-Match", "")):
+                response = HttpResponseNotModified()
+            response["ETag"] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ["Cookie"])
+            return response
         else:
             return JsonResponse(
                 {
@@ -354,13 +364,21 @@ def update_profile_photo(request, post_data):
     """
     try:
         image = request.FILES["profile_image"]
-        request.user.profile_image = image
+        previous = request.user.profile_picture.name
+        request.user.profile_image = store_upload(
+            image,
+            User._meta.get_field("profile_picture").upload_to,
+            request.user.profile_picture.storage,
+        )
         request.user.save()
-        request.user.create_thumbnail()
+        release_upload(previous)
+        job = request.user.queue_thumbnail()
         post_data["last_updated"] = convert_to_string(request.user.last_updated)
         post_data["profile_image"] = request.build_absolute_uri(
             request.user.profile_image
         )
+        post_data["thumbnail_status"] = job.status
+        post_data["thumbnail_job"] = job.pk
         return JsonResponse(
             {
                 "status": "success",
@@ -382,10 +400,19 @@ def update_cover_photo(request, post_data):
     """
     try:
         cover_photo = request.FILES["cover"]
-        request.user.cover = cover_photo
+        previous = request.user.cover.name
+        request.user.cover = store_upload(
+            cover_photo,
+            User._meta.get_field("cover").upload_to,
+            request.user.cover.storage,
+        )
         request.user.save()
+        release_upload(previous)
+        job = request.user.queue_image_job("cover")
         post_data["last_updated"] = convert_to_string(request.user.last_updated)
         post_data["cover"] = request.build_absolute_uri(request.user.cover)
+        post_data["cover_status"] = job.status
+        post_data["cover_job"] = job.pk
         return JsonResponse(
             {
                 "status": "success",
@@ -406,8 +433,10 @@ def remove_cover_photo(request, post_data):
     Removes the user's cover photo.
     """
     try:
+        previous = request.user.cover.name
         request.user.cover = None
         request.user.save()
+        release_upload(previous)
         post_data["cover"] = None
         return JsonResponse(
             {
@@ -429,9 +458,11 @@ def remove_profile_photo(request, post_data):
     Removes the user's profile photo.
     """
     try:
+        previous = request.user.profile_picture.name
         request.user.profile_image = None
         request.user.thumbnail = None
         request.user.save()
+        release_upload(previous)
         post_data["profile_image"] = None
         return JsonResponse(
             {
@@ -448,6 +479,42 @@ def remove_profile_photo(request, post_data):
         )
 
 
+def thumbnail_job_status(request, job_id):
+    """
+    Returns the status of a queued thumbnail job
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {
+                "status": "error",
+                "msg": "User not authenticated",
+                "is_authenticated": False,
+            },
+            status=401,
+        )
+
+    jobs = ThumbnailJob.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(user=request.user)
+    job = jobs.filter(pk=job_id).select_related("user", "group_profile").first()
+    if job is None:
+        return JsonResponse({"status": "error", "msg": "Job not found"}, status=404)
+
+    data = {
+        "id": job.pk,
+        "field": job.field,
+        "thumbnail_status": job.status,
+        "error": job.error,
+    }
+    if job.status == ThumbnailStatusEnum.DONE.value:
+        target = job.target
+        image = getattr(target, job.field)
+        data["srcset"] = get_srcset(image, job.field, target, request)
+        if job.user and job.field == "profile_picture" and job.user.thumbnail:
+            data["thumbnail"] = request.build_absolute_uri(job.user.thumbnail.url)
+    return JsonResponse({"status": "success", "data": data}, status=200)
+
+
 if not settings.IS_PROD:
     update_profile = csrf_exempt(update_profile)
     update_profile_image = csrf_exempt(update_profile_image)
@@ -1,12 +1,13 @@
 # filters.py
 import django_filters
 from ..models import SiteAppRecord
+from ..registry import get_registry
 
 
 class SiteAppRecordFilter(django_filters.FilterSet):
-    category_name = django_filters.CharFilter(
-        field_name="category__name", lookup_expr="icontains"
-    )
+    # Category names are matched (icontains) in the category registry and
+    # filtered by id, without joining the category table
+    category_name = django_filters.CharFilter(method="filter_category_name")
 
     class Meta:
         model = SiteAppRecord
@@ -14,4 +15,7 @@ class SiteAppRecordFilter(django_filters.FilterSet):
             "category",
             "category_name",
             "date_created",
-        ]
\ No newline at end of file
+        ]
+
+    def filter_category_name(self, queryset, name, value):
+        return queryset.filter(category_id__in=get_registry().ids_matching(value))
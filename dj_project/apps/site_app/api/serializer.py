@@ -1,8 +1,13 @@
 from rest_framework import serializers
+from apps.accounts.api.serializer import UserBaseSerializer
+from core.drf.bulk import BulkListSerializer, PreloadedPrimaryKeyRelatedField
+from core.drf.fieldsets import SparseFieldsetMixin
+from ..counters import apply_deltas, count_changes, count_records
 from ..models import SiteAppCategory, SiteAppRecord
+from ..registry import get_registry
 
 
-class SiteAppCategorySerializer(serializers.ModelSerializer):
+class SiteAppCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = SiteAppCategory
         fields = [
@@ -11,15 +16,47 @@ class SiteAppCategorySerializer(serializers.ModelSerializer):
         ]
 
 
-class SiteAppRecordSerializer(serializers.ModelSerializer):
-    # Optional: show category name in response
-    category_name = serializers.CharField(
-        source="category.name", read_only=True
-    )
+class SiteAppRecordListSerializer(BulkListSerializer):
+    def prepare_instances(self, instances, fields=None):
+        """
+        Bulk writes skip ``SiteAppRecord.save()``, keep the search document
+        in step here
+        """
+        if fields is not None and not SiteAppRecord.search_source_fields & fields:
+            return set()
+        for instance in instances:
+            instance.search_document = instance.get_search_document()
+        return {"search_document"}
+
+    def after_write(self, instances, fields=None):
+        """
+        Bulk writes skip the signals keeping the record counters too
+        """
+        if fields is None:
+            apply_deltas(count_records(instances))
+        elif {"category", "user"} & fields:
+            apply_deltas(count_changes(instances))
+
+
+class SiteAppRecordSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Category ids of bulk writes are resolved with one query, see
+    # core.drf.bulk
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
+    # Optional: show category name in response, read from the category
+    # registry rather than a join
+    category_name = serializers.SerializerMethodField()
 
     # Optional: make user read-only (auto-set from request)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
+    # ?expand=category,user renders these in full instead of their ids
+    expandable_fields = {
+        "category": (SiteAppCategorySerializer, {}),
+        "user": (UserBaseSerializer, {}),
+    }
+    field_sources = {"category_name": ["category"]}
+
     class Meta:
         model = SiteAppRecord
         fields = [
@@ -36,3 +73,11 @@ class SiteAppRecordSerializer(serializers.ModelSerializer):
             "date_created",
             "date_modified",
         ]
+        list_serializer_class = SiteAppRecordListSerializer
+
+    def get_category_name(self, instance):
+        # One registry lookup per request rather than per record
+        registry = self.context.get("category_registry")
+        if registry is None:
+            registry = self.context["category_registry"] = get_registry()
+        return registry.get_name(instance.category_id)
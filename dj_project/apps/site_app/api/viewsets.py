@@ -1,10 +1,27 @@
-from rest_framework import viewsets, permissions
+import hashlib
+from django.utils.http import parse_etags, quote_etag
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from core.cache import cache_response
+from core.drf.bulk import BulkWriteMixin
+from core.drf.filters import FullTextSearchFilter
+from core.drf.pagination import KeysetPagination
+from core.drf.prefetch import PrefetchPlanMixin
+from core.streaming import export_response, get_output_format
+from ..bulk import EXPORT_FIELDS, export_records
+from ..counters import get_stats
 from ..models import SiteAppCategory, SiteAppRecord
+from ..registry import get_registry
 from .serializer import SiteAppCategorySerializer, SiteAppRecordSerializer
 from .filters import SiteAppRecordFilter
 
 
-class SiteAppCategoryViewSet(viewsets.ModelViewSet):
+class SiteAppCategoryViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = SiteAppCategory.objects.all()
     serializer_class = SiteAppCategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -13,19 +30,70 @@ class SiteAppCategoryViewSet(viewsets.ModelViewSet):
     ordering_fields = ["name"]
     ordering = ["name"]
 
+    def get_etag(self, request, registry):
+        """
+        Changes with the categories and with the URL, which includes the
+        query string and the host used in pagination links
+        """
+        key = f"{registry.etag}:{request.build_absolute_uri()}"
+        return quote_etag(hashlib.sha1(key.encode()).hexdigest())
 
-class SiteAppRecordViewSet(viewsets.ModelViewSet):
-    queryset = SiteAppRecord.objects.select_related("category", "user")
+    def get_cached_response(self, request, registry, get_data):
+        etag = self.get_etag(request, registry)
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and etag in parse_etags(if_none_match):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(get_data())
+        response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """
+        Served from the in-process category registry, with ``?search=``
+        and ``?ordering=name|-name`` applied in memory
+        """
+        registry = get_registry()
+
+        def get_data():
+            terms = SearchFilter().get_search_terms(request)
+            categories = registry.search(terms) if terms else registry.categories
+            if request.query_params.get(api_settings.ORDERING_PARAM) == "-name":
+                categories = categories[::-1]
+            page = self.paginate_queryset(categories)
+            if page is None:
+                return self.get_serializer(categories, many=True).data
+            return self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            ).data
+
+        return self.get_cached_response(request, registry, get_data)
+
+    def retrieve(self, request, *args, **kwargs):
+        registry = get_registry()
+        try:
+            category = registry.get(int(kwargs[self.lookup_url_kwarg or "pk"]))
+        except ValueError:
+            category = None
+        if category is None:
+            raise NotFound()
+        return self.get_cached_response(
+            request, registry, lambda: self.get_serializer(category).data
+        )
+
+
+class SiteAppRecordViewSet(BulkWriteMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
+    # Relations are joined as the serializer needs them, see PrefetchPlanMixin
+    queryset = SiteAppRecord.objects.all()
     serializer_class = SiteAppRecordSerializer
     filterset_class = SiteAppRecordFilter
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     # permission_classes = [permissions.IsAuthenticated]
 
-    search_fields = [
-        "name",
-        "description",
-        "category__name",
-    ]
+    # ?search= matches name, description and category name through
+    # SiteAppRecord.search_document
 
     filterset_fields = {
         "category": ["exact"],
@@ -40,6 +108,44 @@ class SiteAppRecordViewSet(viewsets.ModelViewSet):
     ]
     ordering = ["-date_created"]
 
+    @cache_response(SiteAppRecord, SiteAppCategory)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(SiteAppRecord, SiteAppCategory)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Stream every record matching the filters, search and ordering of
+        the list as NDJSON, or CSV with ``?output=csv``
+        """
+        queryset = self.filter_queryset(SiteAppRecord.objects.all())
+        return export_response(
+            export_records(queryset),
+            list(EXPORT_FIELDS),
+            get_output_format(request),
+            "records",
+        )
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        """
+        Record counts read from the maintained counters rather than the
+        records table: the total, per category and for the ``?top=``
+        (default 10, max 100) users with the most records, or one user
+        with ``?user=<id>``
+        """
+        try:
+            top = min(int(request.query_params.get("top", 10)), 100)
+            user_id = request.query_params.get("user")
+            user_id = int(user_id) if user_id is not None else None
+        except ValueError:
+            raise ValidationError({"detail": "top and user must be integers"})
+        return Response(get_stats(top=max(top, 0), user_id=user_id))
+
     def perform_create(self, serializer):
         # Automatically attach logged-in user
         serializer.save(user=self.request.user)
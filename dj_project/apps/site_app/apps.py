@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class SiteAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.site_app"
+
+    def ready(self):
+        from core.cache import register_invalidation
+        from . import signals  # noqa: F401
+        from .models import SiteAppCategory, SiteAppRecord
+
+        register_invalidation(SiteAppCategory, SiteAppRecord)
@@ -0,0 +1,36 @@
+"""
+Bulk export of site app records
+"""
+
+from .registry import get_registry
+
+# Exported column: model lookup
+EXPORT_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "category": "category_id",
+    # Named from the category registry, see export_records
+    "category_name": "category_id",
+    "description": "description",
+    "date_created": "date_created",
+    "date_modified": "date_modified",
+    "user": "user_id",
+}
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_records(queryset):
+    """
+    Value tuples of ``EXPORT_FIELDS`` for ``queryset``, read from the
+    database ``EXPORT_CHUNK_SIZE`` rows at a time (a server-side cursor on
+    PostgreSQL)
+    """
+    registry = get_registry()
+    name_index = list(EXPORT_FIELDS).index("category_name")
+    rows = queryset.values_list(*EXPORT_FIELDS.values()).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    for row in rows:
+        row = list(row)
+        row[name_index] = registry.get_name(row[name_index])
+        yield row
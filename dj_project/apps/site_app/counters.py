@@ -0,0 +1,144 @@
+"""
+Denormalized record counts per category and per user
+
+``CategoryRecordCount`` and ``UserRecordCount`` follow ``SiteAppRecord``
+writes in the same transaction: single saves and deletes through the
+signals in ``apps.site_app.signals``, bulk API writes through the record
+list serializer. Dashboards read them instead of counting the table, and
+``manage.py reconcile_record_counts`` recomputes them from it.
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from .models import CategoryRecordCount, SiteAppRecord, UserRecordCount
+from .registry import get_registry
+
+COUNTERS = [(CategoryRecordCount, "category"), (UserRecordCount, "user")]
+
+
+def distinct(records):
+    """
+    ``records`` with one instance per primary key, the last one given, so
+    that copies of a row are counted once
+    """
+    by_pk, unsaved = {}, []
+    for record in records:
+        if record.pk is None:
+            unsaved.append(record)
+        else:
+            by_pk.pop(record.pk, None)
+            by_pk[record.pk] = record
+    return [*by_pk.values(), *unsaved]
+
+
+def count_records(records, sign=1):
+    """
+    Counter deltas for adding (or with ``sign=-1`` removing) ``records``
+    """
+    deltas = Counter()
+    for record in distinct(records):
+        for model, field_name in COUNTERS:
+            deltas[(model, getattr(record, f"{field_name}_id"))] += sign
+    return deltas
+
+
+def count_changes(records):
+    """
+    Counter deltas for records moved to another category or user, compared
+    with the values they were loaded with
+    """
+    deltas = Counter()
+    for record in distinct(records):
+        changes = record.get_changed_fields([name for _, name in COUNTERS])
+        for model, field_name in COUNTERS:
+            if field_name in changes:
+                old, new = changes[field_name]
+                deltas[(model, old)] -= 1
+                deltas[(model, new)] += 1
+    return deltas
+
+
+def apply_deltas(deltas):
+    """
+    Add ``deltas`` to the counters, in a fixed order so concurrent writers
+    lock the rows alike. Missing counters are created for increments; a
+    decrement of a missing counter (its category or user is being deleted)
+    is dropped.
+    """
+    for (model, key), delta in sorted(
+        deltas.items(), key=lambda item: (item[0][0]._meta.label, item[0][1])
+    ):
+        if not delta or key is None:
+            continue
+        counters = model.objects.filter(pk=key)
+        if counters.update(count=F("count") + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(pk=key, count=delta)
+        except IntegrityError:
+            counters.update(count=F("count") + delta)
+
+
+def reconcile():
+    """
+    Recompute every counter from the records table, returns the number of
+    counters created, corrected or deleted
+    """
+    fixed = 0
+    for model, field_name in COUNTERS:
+        with transaction.atomic():
+            actual = dict(
+                SiteAppRecord.objects.order_by()
+                .values_list(field_name)
+                .annotate(total=Count("pk"))
+            )
+            stored = {
+                counter.pk: counter for counter in model.objects.select_for_update()
+            }
+            created, corrected = [], []
+            for key, total in actual.items():
+                counter = stored.pop(key, None)
+                if counter is None:
+                    created.append(model(pk=key, count=total))
+                elif counter.count != total:
+                    counter.count = total
+                    corrected.append(counter)
+            model.objects.bulk_create(created)
+            model.objects.bulk_update(corrected, ["count"])
+            model.objects.filter(pk__in=list(stored)).delete()
+            fixed += len(created) + len(corrected) + len(stored)
+    return fixed
+
+
+def get_stats(top=10, user_id=None):
+    """
+    Record counts read from the counters: the total, every category and
+    the ``top`` users with the most records (or just ``user_id``)
+    """
+    counts = dict(CategoryRecordCount.objects.values_list("pk", "count"))
+    categories = [
+        {"id": category.pk, "name": category.name, "count": counts.get(category.pk, 0)}
+        for category in get_registry().categories
+    ]
+    users = UserRecordCount.objects.select_related("user").only(
+        "count", "user__username"
+    )
+    if user_id is not None:
+        users = users.filter(pk=user_id)
+    else:
+        users = users.order_by("-count", "pk")[:top]
+    return {
+        "total": sum(counts.values()),
+        "categories": categories,
+        "users": [
+            {
+                "id": counter.pk,
+                "username": counter.user.username,
+                "count": counter.count,
+            }
+            for counter in users
+        ],
+    }
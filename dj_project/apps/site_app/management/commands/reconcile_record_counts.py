@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.site_app.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute the per category and per user record counters from the records table."
+
+    def handle(self, *args, **options):
+        fixed = reconcile()
+        self.stdout.write(f"Reconciled record counters, {fixed} fixed")
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("site_app", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="siteapprecord",
+            index=models.Index(
+                fields=["date_created", "id"], name="site_app_si_date_cr_773f53_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="siteapprecord",
+            index=models.Index(
+                fields=["user", "date_created", "id"],
+                name="site_app_si_user_id_48d516_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="siteapprecord",
+            index=models.Index(
+                fields=["category", "date_created", "id"],
+                name="site_app_si_categor_665e85_idx",
+            ),
+        ),
+    ]
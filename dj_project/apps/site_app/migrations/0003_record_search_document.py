@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:08
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Concat
+from core.search import create_fulltext_index, drop_fulltext_index
+
+
+def fill_search_documents(apps, schema_editor):
+    SiteAppCategory = apps.get_model("site_app", "SiteAppCategory")
+    SiteAppRecord = apps.get_model("site_app", "SiteAppRecord")
+    for category in SiteAppCategory.objects.all():
+        SiteAppRecord.objects.filter(category=category).update(
+            search_document=Concat(
+                "name", Value(" "), "description", Value(" "), Value(category.name)
+            )
+        )
+
+
+def create_index(apps, schema_editor):
+    create_fulltext_index(schema_editor, apps.get_model("site_app", "SiteAppRecord"))
+
+
+def drop_index(apps, schema_editor):
+    drop_fulltext_index(schema_editor, apps.get_model("site_app", "SiteAppRecord"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("site_app", "0002_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="siteapprecord",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    SiteAppRecord = apps.get_model("site_app", "SiteAppRecord")
+    for model_name, field_name in [
+        ("CategoryRecordCount", "category"),
+        ("UserRecordCount", "user"),
+    ]:
+        model = apps.get_model("site_app", model_name)
+        totals = (
+            SiteAppRecord.objects.order_by()
+            .values_list(field_name)
+            .annotate(total=Count("pk"))
+        )
+        model.objects.bulk_create(
+            [model(pk=key, count=total) for key, total in totals], batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("site_app", "0003_record_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryRecordCount",
+            fields=[
+                (
+                    "category",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="record_count",
+                        serialize=False,
+                        to="site_app.siteappcategory",
+                    ),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="UserRecordCount",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="site_app_record_count",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["count"], name="site_app_us_count_9e71cd_idx")
+                ],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-
+from core.models import SnapshotModelMixin
 
 
 class SiteAppCategory(models.Model):
@@ -10,13 +10,66 @@ class SiteAppCategory(models.Model):
         return self.name
 
 
-class SiteAppRecord(models.Model):
+class SiteAppRecord(SnapshotModelMixin, models.Model):
     name = models.CharField(max_length=200)
     category = models.ForeignKey(SiteAppCategory, on_delete=models.CASCADE)
     description = models.TextField()
     date_created = models.DateTimeField(auto_now_add=True)
     date_modified = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Name, description and category name, indexed for full-text search
+    # (see core.search)
+    search_document = models.TextField(blank=True, default="", editable=False)
+    # Fields making up search_document
+    search_source_fields = {"name", "description", "category"}
+
+    class Meta:
+        # Keyset pagination orders by (<field>, id), see KeysetPagination
+        indexes = [
+            models.Index(fields=["date_created", "id"]),
+            models.Index(fields=["user", "date_created", "id"]),
+            models.Index(fields=["category", "date_created", "id"]),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def get_search_document(self):
+        return " ".join([self.name, self.description, self.category.name])
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or self.search_source_fields & set(update_fields):
+            self.search_document = self.get_search_document()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "search_document"}
+        # The record counters are updated by signals in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class CategoryRecordCount(models.Model):
+    """Number of records of a category, see apps.site_app.counters"""
+
+    category = models.OneToOneField(
+        SiteAppCategory,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="record_count",
+    )
+    count = models.BigIntegerField(default=0)
+
+
+class UserRecordCount(models.Model):
+    """Number of records of a user, see apps.site_app.counters"""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="site_app_record_count",
+    )
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["count"])]
@@ -0,0 +1,68 @@
+"""
+In-process registry of site app categories
+
+The category table is tiny and rarely changes, so each worker loads it once
+and keeps it while the shared ``SiteAppCategory`` version (see
+``core.cache``) is unchanged; saving or deleting a category bumps that
+version through ``register_invalidation`` and the next lookup reloads.
+Record queries resolve category names here instead of joining the table.
+"""
+
+import hashlib
+import json
+import threading
+
+from core.cache import get_versions
+from .models import SiteAppCategory
+
+
+class CategoryRegistry:
+    """
+    Categories of one version of the table. The instances are shared
+    between requests and must not be modified.
+    """
+
+    def __init__(self, categories):
+        self.categories = sorted(categories, key=lambda category: category.name)
+        self.by_id = {category.pk: category for category in self.categories}
+        rows = [[category.pk, category.name] for category in self.categories]
+        self.etag = hashlib.sha1(json.dumps(rows).encode()).hexdigest()
+
+    def get(self, pk):
+        return self.by_id.get(pk)
+
+    def get_name(self, pk):
+        category = self.by_id.get(pk)
+        return category.name if category is not None else None
+
+    def search(self, terms):
+        """
+        Categories whose name contains every term, case insensitive
+        """
+        terms = [term.lower() for term in terms]
+        return [
+            category
+            for category in self.categories
+            if all(term in category.name.lower() for term in terms)
+        ]
+
+    def ids_matching(self, text):
+        """
+        Ids of the categories whose name contains ``text`` (``icontains``)
+        """
+        return [category.pk for category in self.search([text])]
+
+
+_lock = threading.Lock()
+_registry = None
+_version = None
+
+
+def get_registry():
+    global _registry, _version
+    (version,) = get_versions(SiteAppCategory)
+    with _lock:
+        if _registry is None or _version != version:
+            _registry = CategoryRegistry(SiteAppCategory.objects.all())
+            _version = version
+        return _registry
@@ -0,0 +1,43 @@
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .counters import apply_deltas, count_changes, count_records
+from .models import SiteAppCategory, SiteAppRecord
+
+
+@receiver(post_save, sender=SiteAppCategory)
+def update_record_search_documents(sender, instance, created, **kwargs):
+    """
+    The category name is part of each record's search document
+    """
+    if not created:
+        SiteAppRecord.objects.filter(category=instance).update(
+            search_document=Concat(
+                "name", Value(" "), "description", Value(" "), Value(instance.name)
+            )
+        )
+
+
+@receiver(pre_save, sender=SiteAppRecord)
+def track_record_moves(sender, instance, update_fields=None, **kwargs):
+    instance.__dict__.pop("_counter_deltas", None)
+    if instance._state.adding:
+        return
+    if update_fields is not None and not {"category", "user"} & set(update_fields):
+        return
+    instance._counter_deltas = count_changes([instance])
+
+
+@receiver(post_save, sender=SiteAppRecord)
+def update_record_counters(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        apply_deltas(count_records([instance]))
+    else:
+        apply_deltas(instance.__dict__.pop("_counter_deltas", {}))
+    instance.take_snapshot(update_fields)
+
+
+@receiver(post_delete, sender=SiteAppRecord)
+def remove_from_record_counters(sender, instance, **kwargs):
+    apply_deltas(count_records([instance], sign=-1))
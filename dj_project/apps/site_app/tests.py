@@ -1,3 +1,122 @@
-from django.test import TestCase
+from unittest import mock
+from django.db import connection
+from core.search import _postgresql, fulltext_search
+from core.testing import APITestCase, TestCase, create_user
+from .api.serializer import SiteAppRecordSerializer
+from .counters import count_changes, count_records
+from .models import CategoryRecordCount, SiteAppCategory, SiteAppRecord
 
-# Create your tests here.
+
+class BulkCreateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("owner")
+        cls.category = SiteAppCategory.objects.create(name="News")
+
+    def create(self):
+        data = [
+            {"name": f"record{i}", "description": "text", "category": self.category.pk}
+            for i in range(3)
+        ]
+        serializer = SiteAppRecordSerializer(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=self.user)
+        return serializer
+
+    def assertCreated(self, serializer):
+        ids = sorted(SiteAppRecord.objects.values_list("pk", flat=True))
+        results = serializer.get_results()
+        self.assertEqual(sorted(result["id"] for result in results), ids)
+        self.assertEqual(CategoryRecordCount.objects.get().count, 3)
+        self.assertEqual(
+            SiteAppRecord.objects.get(name="record0").search_document,
+            "record0 text News",
+        )
+
+    def test_bulk_insert(self):
+        self.assertCreated(self.create())
+
+    def test_without_returning_rows(self):
+        # As on MySQL, where bulk_create leaves the ids unset
+        with mock.patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", False
+        ):
+            self.assertCreated(self.create())
+
+
+class BulkWriteTests(APITestCase):
+    url = "/site_app/records/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.news = SiteAppCategory.objects.create(name="News")
+        cls.sports = SiteAppCategory.objects.create(name="Sports")
+        cls.record = SiteAppRecord.objects.create(
+            name="record", description="text", category=cls.news, user=cls.admin
+        )
+
+    def get_counts(self):
+        return dict(CategoryRecordCount.objects.values_list("pk", "count"))
+
+    def test_update_moves_record(self):
+        item = {"id": self.record.pk, "category": self.sports.pk}
+        response = self.client.patch(self.url, [item], content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_counts(), {self.news.pk: 0, self.sports.pk: 1})
+
+    def test_copies_counted_once(self):
+        copies = list(SiteAppRecord.objects.all()) + list(SiteAppRecord.objects.all())
+        for copy in copies:
+            copy.category = self.sports
+        self.assertEqual(
+            count_changes(copies),
+            {
+                (CategoryRecordCount, self.news.pk): -1,
+                (CategoryRecordCount, self.sports.pk): 1,
+            },
+        )
+        self.assertEqual(
+            count_records(copies, sign=-1)[(CategoryRecordCount, self.sports.pk)], -1
+        )
+
+    def test_update_duplicate_id(self):
+        item = {"id": self.record.pk, "category": self.sports.pk}
+        response = self.client.patch(self.url, [item, item], content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        ok, duplicate = response.json()["results"]
+        self.assertEqual(ok["status"], "ok")
+        self.assertEqual(duplicate["errors"], {"id": ["Duplicate id."]})
+        self.assertEqual(self.get_counts(), {self.news.pk: 0, self.sports.pk: 1})
+
+    def test_destroy_duplicate_id(self):
+        response = self.client.delete(
+            self.url, [self.record.pk, self.record.pk], content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["summary"], {"action": "delete", "ok": 1, "error": 1}
+        )
+        self.assertEqual(self.get_counts(), {self.news.pk: 0})
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = SiteAppCategory.objects.create(name="News")
+        cls.record = SiteAppRecord.objects.create(
+            name="Elections",
+            description="Results",
+            category=category,
+            user=create_user("owner"),
+        )
+
+    def test_prefixes(self):
+        records = fulltext_search(SiteAppRecord.objects.all(), "elect res")
+        self.assertEqual(list(records), [self.record])
+
+    def test_postgresql_prefixes(self):
+        match, rank = _postgresql(connection, SiteAppRecord, ["elect", "res"])
+        self.assertIn("to_tsquery", match.sql)
+        self.assertEqual(match.params, ["'elect':* & 'res':*"])
+        self.assertEqual(rank.params, match.params)
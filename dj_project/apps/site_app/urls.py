@@ -1,7 +1,7 @@
-from rest_framework.routers import DefaultRouter
+from core.drf.routers import BulkRouter
 from .api.viewsets import SiteAppCategoryViewSet, SiteAppRecordViewSet
 
-router = DefaultRouter()
+router = BulkRouter()
 router.register(r"categories", SiteAppCategoryViewSet, basename="category")
 router.register(r"records", SiteAppRecordViewSet, basename="record")
 
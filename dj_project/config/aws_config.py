@@ -15,6 +15,10 @@ AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY', '')
 AWS_S3_REGION_NAME = 'ap-southeast-1'  # Example: Singapore
 AWS_S3_CUSTOM_DOMAIN = os.getenv("AWS_S3_CUSTOM_DOMAIN", "")
 
+# Files read back from S3 (e.g. when creating thumbnails) are buffered in
+# memory up to this size and spooled to a temporary file beyond it
+AWS_S3_MAX_MEMORY_SIZE = int(os.getenv("AWS_S3_MAX_MEMORY_SIZE", 5 * 1024 * 1024))
+
 # Optional: Media files configuration
 #MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
 #AWS_LOCATION = 'media'  # folder inside the bucket
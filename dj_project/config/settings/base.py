@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 import environ
 
@@ -147,6 +148,12 @@ STATIC_ROOT = BASE_DIR / "static/"
 STATIC_URL = env("STATIC_URL", default="/static/")
 MEDIA_URL = env("MEDIA_URL", default="/media/")
 
+# Uploads are hashed while they stream in, see core.media_helper
+FILE_UPLOAD_HANDLERS = [
+    "core.uploadhandlers.HashingMemoryFileUploadHandler",
+    "core.uploadhandlers.HashingTemporaryFileUploadHandler",
+]
+
 
 LOGGING = {
     "version": 1,
@@ -242,6 +249,57 @@ AUTH_USER_MODEL = "accounts.User"
 IS_PROD = env("IS_PROD", default=False)
 SILENCED_SYSTEM_CHECKS = ["models.E007"]
 
+# Background thumbnail jobs, 0 disables the in-process pool and leaves the
+# queue to `manage.py process_thumbnail_jobs`
+THUMBNAIL_JOB_WORKERS = env.int("THUMBNAIL_JOB_WORKERS", default=2)
+
+# Seconds after which a running thumbnail job is taken as lost (e.g. its
+# worker was killed) and queued again
+THUMBNAIL_JOB_TIMEOUT = env.int("THUMBNAIL_JOB_TIMEOUT", default=600)
+
+# Processes hashing passwords for bulk user imports, the number of CPUs by
+# default, 0 hashes in the request process. See core.passwords
+PASSWORD_HASH_WORKERS = env.int("PASSWORD_HASH_WORKERS", default=None)
+
+# Responsive copies made for profile pictures, covers and group images
+IMAGE_DERIVATIVE_WIDTHS = env.list(
+    "IMAGE_DERIVATIVE_WIDTHS", cast=int, default=[80, 320, 640, 1280]
+)
+IMAGE_DERIVATIVE_FORMATS = env.list("IMAGE_DERIVATIVE_FORMATS", default=["webp", "avif"])
+
+# Images ingested from remote urls, see core.remote_images: largest download,
+# accepted PIL formats, concurrent downloads, and an optional directory
+# caching the downloads between imports
+REMOTE_IMAGE_MAX_BYTES = env.int("REMOTE_IMAGE_MAX_BYTES", default=10 * 1024 * 1024)
+REMOTE_IMAGE_FORMATS = env.list(
+    "REMOTE_IMAGE_FORMATS", default=["JPEG", "PNG", "WEBP", "GIF"]
+)
+REMOTE_IMAGE_CONCURRENCY = env.int("REMOTE_IMAGE_CONCURRENCY", default=8)
+REMOTE_IMAGE_CACHE_DIR = env("REMOTE_IMAGE_CACHE_DIR", default=None)
+
+# Rows per INSERT/UPDATE and items per request of the bulk API writes, see
+# core.drf.bulk
+BULK_BATCH_SIZE = env.int("BULK_BATCH_SIZE", default=500)
+BULK_MAX_ITEMS = env.int("BULK_MAX_ITEMS", default=5000)
+
+# Two cache tiers: "default" is an LRU local-memory cache per process,
+# "shared" is visible to every worker (a file based cache unless
+# SHARED_CACHE_URL points at e.g. redis:// or pymemcache://). See core.cache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "local",
+        "TIMEOUT": env.int("CACHE_TIMEOUT", default=300),
+        "OPTIONS": {"MAX_ENTRIES": env.int("CACHE_MAX_ENTRIES", default=5000)},
+    },
+    "shared": env.cache_url(
+        "SHARED_CACHE_URL",
+        default=f"filecache://{Path(tempfile.gettempdir()) / 'dj_project_cache'}",
+    ),
+}
+CACHE_SHARED_ALIAS = "shared"
+CACHE_STATS_FLUSH_EVERY = env.int("CACHE_STATS_FLUSH_EVERY", default=50)
+
 PORKBUN_SECRETAPIKEY = env("PORKBUN_SECRETAPIKEY")
 PORKBUN_APIKEY = env("PORKBUN_APIKEY")
 
@@ -0,0 +1,274 @@
+"""
+Project cache layer
+
+Two tiers are configured in ``CACHES``: ``default`` is a per-process LRU
+local-memory cache and ``CACHE_SHARED_ALIAS`` (``shared``) is a cache all
+workers can see (file based locally, any Django cache backend in
+production). Values are read from the local tier first and filled from the
+shared tier.
+
+Keys are versioned per model and per instance. The version tokens live in
+the shared tier only and are replaced whenever a registered model changes,
+so entries cached by other workers stop matching without having to be
+deleted.
+"""
+
+import hashlib
+import threading
+from collections import defaultdict
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from rest_framework.response import Response
+
+VERSION_KEY = "cache_version:{label}"
+STATS_KEY = "cache_stats:{namespace}:{kind}"
+HIT = "hits"
+MISS = "misses"
+
+
+def get_local():
+    return caches["default"]
+
+
+def get_shared():
+    alias = getattr(settings, "CACHE_SHARED_ALIAS", None)
+    if alias and alias in settings.CACHES:
+        return caches[alias]
+    return caches["default"]
+
+
+def _version_label(target):
+    """
+    ``app_label.model`` for a model class, ``app_label.model:pk`` for an
+    instance, strings are used as they are
+    """
+    if isinstance(target, str):
+        return target
+    if isinstance(target, type):
+        return target._meta.label_lower
+    return f"{target._meta.label_lower}:{target.pk}"
+
+
+def get_versions(*targets):
+    """
+    Current version tokens of the given models/instances, fetched with one
+    shared cache call. Missing versions are started fresh.
+    """
+    shared = get_shared()
+    keys = [VERSION_KEY.format(label=_version_label(target)) for target in targets]
+    found = shared.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            found[key] = uuid4().hex
+            shared.set(key, found[key], None)
+        versions.append(found[key])
+    return versions
+
+
+def bump_version(target):
+    """
+    Invalidate everything cached against ``target`` (a model, an instance
+    or a name), returns the new version
+    """
+    version = uuid4().hex
+    get_shared().set(VERSION_KEY.format(label=_version_label(target)), version, None)
+    return version
+
+
+def bump_versions(*targets):
+    """
+    ``bump_version`` for many targets with a single cache write
+    """
+    get_shared().set_many(
+        {
+            VERSION_KEY.format(label=_version_label(target)): uuid4().hex
+            for target in targets
+        },
+        None,
+    )
+
+
+def versioned_key(namespace, targets, *parts):
+    """
+    Key of ``parts`` under the current versions of ``targets``. Versions
+    and parts are hashed so that keys stay short whatever the parts are
+    (e.g. URLs), memcached rejects keys over 250 characters.
+    """
+    versions = get_versions(*targets) if targets else []
+    digest = hashlib.md5(
+        ":".join([*versions, *(str(part) for part in parts)]).encode()
+    ).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def cache_get(namespace, key):
+    """
+    Read ``key`` from the local tier, then the shared tier. Returns None on
+    a miss.
+    """
+    local = get_local()
+    value = local.get(key)
+    if value is None:
+        shared = get_shared()
+        if shared is not local:
+            value = shared.get(key)
+            if value is not None:
+                local.set(key, value)
+    stats.record(namespace, MISS if value is None else HIT)
+    return value
+
+
+def cache_set(key, value, timeout=DEFAULT_TIMEOUT):
+    local = get_local()
+    shared = get_shared()
+    local.set(key, value, timeout)
+    if shared is not local:
+        shared.set(key, value, timeout)
+
+
+class CacheStats:
+    """
+    Hit/miss counters per namespace. Counted in process and added to the
+    shared tier every ``CACHE_STATS_FLUSH_EVERY`` events, so the totals
+    cover all workers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(int)
+        self.events = 0
+
+    def record(self, namespace, kind):
+        with self.lock:
+            self.pending[(namespace, kind)] += 1
+            self.events += 1
+            flush = self.events >= getattr(settings, "CACHE_STATS_FLUSH_EVERY", 50)
+        if flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending, self.events = self.pending, defaultdict(int), 0
+        shared = get_shared()
+        for (namespace, kind), count in pending.items():
+            key = STATS_KEY.format(namespace=namespace, kind=kind)
+            if not shared.add(key, count, None):
+                try:
+                    shared.incr(key, count)
+                except ValueError:
+                    shared.set(key, count, None)
+            namespaces = shared.get("cache_stats:namespaces", set())
+            if namespace not in namespaces:
+                shared.set("cache_stats:namespaces", namespaces | {namespace}, None)
+
+    def totals(self):
+        """
+        ``{namespace: {"hits": n, "misses": n, "hit_rate": r}}``
+        """
+        self.flush()
+        shared = get_shared()
+        totals = {}
+        for namespace in sorted(shared.get("cache_stats:namespaces", set())):
+            hits = shared.get(STATS_KEY.format(namespace=namespace, kind=HIT), 0)
+            misses = shared.get(STATS_KEY.format(namespace=namespace, kind=MISS), 0)
+            lookups = hits + misses
+            totals[namespace] = {
+                HIT: hits,
+                MISS: misses,
+                "hit_rate": hits / lookups if lookups else 0,
+            }
+        return totals
+
+    def reset(self):
+        shared = get_shared()
+        namespaces = shared.get("cache_stats:namespaces", set())
+        shared.delete_many(
+            [
+                STATS_KEY.format(namespace=namespace, kind=kind)
+                for namespace in namespaces
+                for kind in (HIT, MISS)
+            ]
+            + ["cache_stats:namespaces"]
+        )
+
+
+stats = CacheStats()
+
+
+def get_request_key(request):
+    """
+    Absolute URL of ``request`` with its query parameters sorted, so the
+    same query written in another order shares the entry
+    """
+    query = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    return f"{request.build_absolute_uri(request.path)}?{query}"
+
+
+def cache_response(
+    *models, namespace=None, timeout=DEFAULT_TIMEOUT, vary_on_user=False
+):
+    """
+    Cache the data of a viewset ``list``/``retrieve`` response. The key is
+    versioned by ``models`` and includes the absolute URL, so any query
+    string (and the host used for media URLs) gets its own entry. Only 200
+    responses are cached. Entries expire after the ``TIMEOUT`` of the cache
+    unless ``timeout`` is given, as every query string makes its own.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            name = namespace or f"{self.basename}.{method.__name__}"
+            parts = [get_request_key(request)]
+            if vary_on_user:
+                parts.append(request.user.pk)
+            key = versioned_key(name, models, *parts)
+            data = cache_get(name, key)
+            if data is not None:
+                return Response(data)
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache_set(key, response.data, timeout)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _bump_instance(sender, instance, **kwargs):
+    bump_version(sender)
+    bump_version(instance)
+
+
+def _bump_relation(sender, instance, action, model, **kwargs):
+    if action.startswith("post_"):
+        bump_version(type(instance))
+        bump_version(instance)
+        bump_version(model)
+
+
+def register_invalidation(*models):
+    """
+    Bump the model and instance versions of ``models`` whenever they are
+    saved, deleted or their many-to-many relations change. Call from
+    ``AppConfig.ready()``.
+    """
+    for model in models:
+        post_save.connect(_bump_instance, sender=model, weak=False)
+        post_delete.connect(_bump_instance, sender=model, weak=False)
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(
+                _bump_relation, sender=field.remote_field.through, weak=False
+            )
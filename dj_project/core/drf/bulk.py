@@ -0,0 +1,325 @@
+"""
+Bulk writes through list serializers
+
+``BulkListSerializer`` validates each item on its own: an item that fails
+is left out of ``validated_data`` and reported in ``item_errors`` instead
+of rejecting the whole list. Related ids are resolved for all items with
+one ``in`` query per relation, and rows are written with
+``bulk_create``/``bulk_update`` in batches of ``BULK_BATCH_SIZE``. Backends
+that cannot return the ids of a bulk insert save created rows one by one.
+
+``BulkWriteMixin`` exposes it on the list URL of a viewset: POST of a list
+creates, PATCH of a list partially updates by ``id`` and DELETE of a list
+of ids deletes (the last two need ``core.drf.routers.BulkRouter``).
+"""
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections, router, transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from core.cache import bump_versions
+
+
+def get_batch_size():
+    return getattr(settings, "BULK_BATCH_SIZE", 500)
+
+
+def get_max_items():
+    return getattr(settings, "BULK_MAX_ITEMS", 5000)
+
+
+def _list_error(message, code):
+    return ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code=code)
+
+
+def to_pk(model, value):
+    """
+    ``value`` as a primary key of ``model``, None when it cannot be one
+    """
+    if isinstance(value, dict):
+        value = value.get("id")
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except DjangoValidationError:
+        return None
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks ids up in ``preloaded`` (``{pk: object}``) when it is set, see
+    ``BulkListSerializer.preload_relations``, instead of one query per value
+    """
+
+    preloaded = None
+
+    def to_internal_value(self, data):
+        if self.preloaded is None:
+            return super().to_internal_value(data)
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        pk = to_pk(self.get_queryset().model, data)
+        if pk is None or isinstance(data, dict):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.preloaded[pk]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ``many=True`` serializer for bulk writes, set it as the
+    ``list_serializer_class`` of a model serializer. After validation
+    ``item_errors`` maps the index of each rejected item to its errors and
+    ``valid_indexes`` lists the indexes of the items in ``validated_data``.
+    """
+
+    def preload_relations(self, data):
+        """
+        Resolve the ids given to each writable
+        ``PreloadedPrimaryKeyRelatedField`` with a single ``in`` query
+        """
+        for name, field in self.child.fields.items():
+            if field.read_only or not isinstance(
+                field, PreloadedPrimaryKeyRelatedField
+            ):
+                continue
+            queryset = field.get_queryset()
+            ids = {
+                to_pk(queryset.model, item.get(name))
+                for item in data
+                if isinstance(item, dict)
+            }
+            ids.discard(None)
+            field.preloaded = queryset.in_bulk(ids)
+
+    def run_child_validation(self, data, index=None):
+        if isinstance(self.instance, list) and index is not None:
+            self.child.instance = self.instance[index]
+        return self.child.run_validation(data)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages["not_a_list"].format(
+                input_type=type(data).__name__
+            )
+            raise _list_error(message, "not_a_list")
+        if not data:
+            raise _list_error(self.error_messages["empty"], "empty")
+        max_length = self.max_length or get_max_items()
+        if len(data) > max_length:
+            message = self.error_messages["max_length"].format(max_length=max_length)
+            raise _list_error(message, "max_length")
+
+        self.preload_relations(data)
+        self.item_errors = {}
+        self.valid_indexes = []
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                validated.append(self.run_child_validation(item, index))
+            except ValidationError as exc:
+                self.item_errors[index] = exc.detail
+            else:
+                self.valid_indexes.append(index)
+        return validated
+
+    def prepare_instances(self, instances, fields=None):
+        """
+        Hook for what ``save()`` would do, as bulk writes skip it. Called
+        with the instances about to be written and, on updates, the names
+        of the changed fields. Returns the names of extra fields it set.
+        """
+        return set()
+
+    def after_write(self, instances, fields=None):
+        """
+        Hook called in the transaction of the write, with the instances
+        just written and, on updates, the names of the written fields
+        """
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        connection = connections[router.db_for_write(model)]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # bulk_create would leave the ids unset (MySQL), the rows are
+            # saved one by one instead, their save() and signals doing the
+            # work of the hooks
+            with transaction.atomic():
+                for instance in instances:
+                    instance.save(force_insert=True)
+            return instances
+        self.prepare_instances(instances)
+        with transaction.atomic():
+            model._default_manager.bulk_create(instances, batch_size=get_batch_size())
+            self.after_write(instances)
+            # No post_save signals either, see core.cache.register_invalidation.
+            # Nothing is cached against the new instances yet
+            transaction.on_commit(lambda: bump_versions(model))
+        return instances
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        instances = [instances[index] for index in self.valid_indexes]
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            fields.update(attrs)
+        if not instances or not fields:
+            return instances
+
+        now = timezone.now()
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False):
+                for instance in instances:
+                    setattr(instance, field.attname, now)
+                fields.add(field.name)
+        fields |= self.prepare_instances(instances, fields)
+        with transaction.atomic():
+            model._default_manager.bulk_update(
+                instances, sorted(fields), batch_size=get_batch_size()
+            )
+            self.after_write(instances, fields)
+            transaction.on_commit(lambda: bump_versions(model, *instances))
+        return instances
+
+    def get_results(self, indexes=None):
+        """
+        One result per item in input order, ``indexes`` maps the items
+        given to this serializer back to the request
+        """
+        saved = dict(zip(self.valid_indexes, self.instance or []))
+        results = []
+        for index in range(len(self.item_errors) + len(self.valid_indexes)):
+            request_index = indexes[index] if indexes is not None else index
+            if index in self.item_errors:
+                results.append(
+                    {
+                        "index": request_index,
+                        "status": "error",
+                        "errors": self.item_errors[index],
+                    }
+                )
+            else:
+                results.append(
+                    {"index": request_index, "status": "ok", "id": saved[index].pk}
+                )
+        return results
+
+
+class BulkWriteMixin:
+    """
+    ViewSet mixin adding list-level writes on top of the one-object ones.
+    The response lists one ``{"index", "status", "id"|"errors"}`` result
+    per item and a ``summary``; it is a 400 only when no item succeeded.
+    """
+
+    def get_bulk_response(self, action, results):
+        summary = {"action": action, "ok": 0, "error": 0}
+        for result in results:
+            summary[result["status"]] += 1
+        results.sort(key=lambda result: result["index"])
+        failed = summary["error"] and not summary["ok"]
+        return Response(
+            {"results": results, "summary": summary},
+            status=status.HTTP_400_BAD_REQUEST if failed else status.HTTP_200_OK,
+        )
+
+    def get_bulk_items(self, request):
+        """
+        ``(found, results)``: ``found`` maps the index of each item naming
+        an existing object to that object, ``results`` holds the errors of
+        the others. An id repeated in the list is an error after its first
+        item, as it would be written (and counted) twice.
+        """
+        data = request.data
+        if not isinstance(data, list) or not data:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["Expected a list of items."]}
+            )
+        if len(data) > get_max_items():
+            raise ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f"Ensure there are no more than {get_max_items()} items."
+                    ]
+                }
+            )
+        queryset = self.get_queryset()
+        pks = [to_pk(queryset.model, item) for item in data]
+        objects = queryset.in_bulk({pk for pk in pks if pk is not None})
+        found, results, seen = {}, [], set()
+        for index, pk in enumerate(pks):
+            if pk in objects and pk not in seen:
+                found[index] = objects[pk]
+                seen.add(pk)
+            else:
+                if pk is None:
+                    error = "A valid id is required."
+                elif pk in seen:
+                    error = "Duplicate id."
+                else:
+                    error = "Not found."
+                results.append(
+                    {
+                        "index": index,
+                        "status": "error",
+                        "errors": {"id": [error]},
+                    }
+                )
+        return found, results
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        if serializer.valid_indexes:
+            self.perform_create(serializer)
+        return self.get_bulk_response("create", serializer.get_results())
+
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Partially update the objects named by the ``id`` of each item
+        """
+        found, results = self.get_bulk_items(request)
+        indexes = list(found)
+        if indexes:
+            serializer = self.get_serializer(
+                [found[index] for index in indexes],
+                data=[request.data[index] for index in indexes],
+                many=True,
+                partial=True,
+            )
+            serializer.is_valid(raise_exception=True)
+            if serializer.valid_indexes:
+                self.perform_update(serializer)
+            results.extend(serializer.get_results(indexes))
+        return self.get_bulk_response("update", results)
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        """
+        Delete the objects whose ids are listed (as ids or ``{"id": ...}``)
+        """
+        found, results = self.get_bulk_items(request)
+        if found:
+            self.perform_bulk_destroy(
+                self.get_queryset().filter(pk__in=[obj.pk for obj in found.values()])
+            )
+        results.extend(
+            {"index": index, "status": "ok", "id": obj.pk}
+            for index, obj in found.items()
+        )
+        return self.get_bulk_response("delete", results)
+
+    def perform_bulk_destroy(self, queryset):
+        with transaction.atomic():
+            queryset.delete()
@@ -0,0 +1,87 @@
+"""
+Sparse fieldsets: ``?fields=``, ``?omit=`` and ``?expand=``
+
+Each parameter takes a comma separated list of field names, nested
+serializers are reached with dots (``?fields=id,groups.name``). Only read
+requests are affected, writes always see every field.
+"""
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+EXPAND_PARAM = "expand"
+
+
+def parse_fieldset(value):
+    """
+    ``"a,b.c,b.d"`` to ``{"a": {}, "b": {"c": {}, "d": {}}}``
+    """
+    tree = {}
+    for path in (value or "").split(","):
+        node = tree
+        for name in filter(None, path.strip().split(".")):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin narrowing its fields to what the request asks for.
+
+    ``expandable_fields`` maps a field name to ``(serializer_class,
+    kwargs)``, rendered in place of the default field on ``?expand=``.
+    ``field_sources`` lists the model fields (``__`` paths) read by fields
+    that are not plain model fields, such as method fields and properties;
+    ``PrefetchPlanMixin`` uses it to load and join just those.
+    """
+
+    expandable_fields = {}
+    field_sources = {}
+
+    def get_fieldset(self):
+        """
+        ``(fields, omit, expand)`` trees, or None when nothing was asked
+        """
+        if hasattr(self, "_fieldset"):
+            return self._fieldset
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        request = self.context.get("request")
+        if parent is not None or request is None or request.method not in SAFE_METHODS:
+            return None
+        params = request.query_params
+        if not {FIELDS_PARAM, OMIT_PARAM, EXPAND_PARAM} & set(params):
+            return None
+        return (
+            parse_fieldset(params.get(FIELDS_PARAM)),
+            parse_fieldset(params.get(OMIT_PARAM)),
+            parse_fieldset(params.get(EXPAND_PARAM)),
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return fields
+        include, omit, expand = fieldset
+
+        for name in expand:
+            if name in self.expandable_fields and name in fields:
+                serializer_class, kwargs = self.expandable_fields[name]
+                fields[name] = serializer_class(read_only=True, **kwargs)
+        for name in list(fields):
+            if (include and name not in include) or omit.get(name) == {}:
+                del fields[name]
+
+        for name, field in fields.items():
+            nested = field.child if isinstance(field, ListSerializer) else field
+            if isinstance(nested, SparseFieldsetMixin):
+                nested._fieldset = (
+                    include.get(name, {}),
+                    omit.get(name, {}),
+                    expand.get(name, {}),
+                )
+        return fields
@@ -0,0 +1,24 @@
+"""
+Filter backends shared by the API viewsets
+"""
+
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+from core.search import RANK, fulltext_search, get_terms
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    ``?search=`` through the model's full-text index (see ``core.search``)
+    instead of ``icontains`` on ``search_fields``. Results are ordered by
+    rank unless ``?ordering=`` is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "")
+        if not get_terms(text):
+            return queryset
+        queryset = fulltext_search(queryset, text)
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.order_by(f"-{RANK}")
+        return queryset
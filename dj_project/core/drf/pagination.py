@@ -0,0 +1,265 @@
+"""
+Keyset (cursor) pagination
+
+Pages are located with a ``WHERE`` on the ordering columns of the last row
+seen instead of an ``OFFSET``, so every page costs the same as the first
+one when an index covers the ordering (e.g. ``(date_created, id)``).
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    LimitOffsetPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+
+
+def estimate_count(queryset):
+    """
+    Row count of an unfiltered ``queryset`` from the database statistics,
+    None when the backend has none (e.g. SQLite) or the queryset is filtered
+    """
+    if queryset.query.where:
+        return None
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+    elif connection.vendor == "mysql":
+        sql = (
+            "SELECT table_rows FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s"
+        )
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class AnnotationKey:
+    """
+    Stands in for a model field when ordering by an annotation
+    """
+
+    def __init__(self, name):
+        self.name = self.attname = name
+
+    def __eq__(self, other):
+        return isinstance(other, AnnotationKey) and other.name == self.name
+
+    def value_to_string(self, obj):
+        return getattr(obj, self.name)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over every ordering field plus the primary key.
+
+    The ordering is the one the filter backends left on the queryset (so
+    ``?ordering=`` keeps working) and the pk is appended to break ties.
+    Ordering fields must be non-null columns of the model itself or
+    annotations.
+
+    ``?count=exact|estimate|none`` picks how ``count`` is filled: an exact
+    ``COUNT(*)`` (the default), the table statistics when nothing is
+    filtered (falling back to an exact count), or nothing at all.
+
+    Requests that still send ``?offset=`` get ``LimitOffsetPagination``.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    count_query_param = "count"
+    offset_query_param = "offset"
+    default_count = COUNT_EXACT
+    ordering = ("-pk",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.offset_paginator = None
+        if self.offset_query_param in request.query_params:
+            self.offset_paginator = LimitOffsetPagination()
+            return self.offset_paginator.paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        self.fields = self.get_ordering_fields(request, queryset, view)
+        self.count = self.get_count(queryset, request)
+        values, reverse = self.decode_cursor(request)
+
+        order_by = [
+            f"-{field.attname}" if descending != reverse else field.attname
+            for field, descending in self.fields
+        ]
+        queryset = queryset.order_by(*order_by)
+        loaded, deferred = queryset.query.deferred_loading
+        if loaded and not deferred:
+            # Narrowed with only(), the cursor still needs the ordering values
+            queryset = queryset.only(
+                *loaded,
+                *(
+                    field.name
+                    for field, _ in self.fields
+                    if not isinstance(field, AnnotationKey)
+                ),
+            )
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.get_position_filter(values, reverse))
+            except (ValidationError, ValueError, TypeError):
+                # Cursors can be edited by clients, values of the wrong type
+                # are as invalid as malformed ones
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[: self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[: self.limit]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.first, self.last = (results[0], results[-1]) if results else (None, None)
+        return results
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.limit_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering_fields(self, request, queryset, view):
+        """
+        ``[(field, descending)]`` ending with the primary key. The queryset's
+        own ordering wins, so filter backends that re-order (e.g. by search
+        rank) are paged in that order.
+        """
+        ordering = [name for name in queryset.query.order_by if isinstance(name, str)]
+        if not ordering:
+            ordering = self.ordering
+            for backend in getattr(view, "filter_backends", []):
+                if hasattr(backend, "get_ordering"):
+                    ordering = (
+                        backend().get_ordering(request, queryset, view) or ordering
+                    )
+                    break
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        opts = queryset.model._meta
+        fields = []
+        for name in ordering:
+            descending = name.startswith("-")
+            name = name.lstrip("-")
+            if name in queryset.query.annotations:
+                field = AnnotationKey(name)
+            else:
+                field = opts.pk if name == "pk" else opts.get_field(name)
+            if field not in [seen for seen, _ in fields]:
+                fields.append((field, descending))
+            if field == opts.pk:
+                break
+        if fields[-1][0] != opts.pk:
+            fields.append((opts.pk, fields[-1][1]))
+        return fields
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param, self.default_count)
+        if mode == COUNT_NONE:
+            return None
+        if mode == COUNT_ESTIMATE:
+            estimate = estimate_count(queryset)
+            if estimate is not None:
+                return estimate
+        return queryset.count()
+
+    def get_position_filter(self, values, reverse):
+        """
+        ``(a, b, pk) > (x, y, z)`` written as
+        ``a > x OR (a = x AND b > y) OR (a = x AND b = y AND pk > z)``
+        with the comparison flipped per descending field
+        """
+        if len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        clauses = []
+        equal = {}
+        for (field, descending), value in zip(self.fields, values):
+            lookup = "lt" if descending != reverse else "gt"
+            clauses.append(Q(**equal, **{f"{field.attname}__{lookup}": value}))
+            equal[field.attname] = value
+        return reduce(lambda left, right: left | right, clauses)
+
+    def get_position(self, instance):
+        """
+        Ordering values of ``instance`` as strings; ``value_to_string`` keeps
+        full precision (e.g. datetime microseconds) so ties compare equal
+        """
+        return [field.value_to_string(instance) for field, _ in self.fields]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            return list(data["p"]), bool(data.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        data = {"p": self.get_position(instance)}
+        if reverse:
+            data["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(data).encode())
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded.decode())
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return Response(
+            {
+                "count": self.count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return LimitOffsetPagination().get_paginated_response_schema(schema)
@@ -0,0 +1,183 @@
+"""
+Build select_related/prefetch_related/only plans from serializer fields
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField
+
+
+def _lookup(prefix, source):
+    path = source.replace(".", "__")
+    return f"{prefix}__{path}" if prefix else path
+
+
+def _get_model_field(serializer, name):
+    """
+    Model field or relation named ``name``, reverse relations are also
+    found by their accessor (``account_set``)
+    """
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    if model is None:
+        return None
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        pass
+    for field in model._meta.related_objects:
+        if field.get_accessor_name() == name:
+            return field
+    return None
+
+
+def _get_relations(serializer, name, field):
+    """
+    Single-valued relations read by a non-nested field: dotted sources
+    (``category.name``) and the ``field_sources`` hints of the serializer
+    """
+    paths = getattr(serializer, "field_sources", {}).get(name)
+    if paths is None:
+        paths = ["__".join(field.source_attrs)] if field.source != "*" else []
+    relations = []
+    for path in paths:
+        parts = path.split("__")[:-1]
+        model_field = _get_model_field(serializer, parts[0]) if parts else None
+        if model_field is not None and model_field.is_relation:
+            if not (model_field.many_to_many or model_field.one_to_many):
+                relations.append("__".join(parts))
+    return relations
+
+
+def build_prefetch_plan(serializer, prefix="", project=False):
+    """
+    Walk the readable nested fields of ``serializer`` and return a tuple of
+    ``(select_related, prefetch_related)`` lookups that load every relation
+    it renders in a fixed number of queries.
+
+    Single nested serializers are joined with ``select_related``. Nested
+    serializers of to-many relations become ``Prefetch`` objects whose
+    queryset carries the plan of the child serializer, so the profile of
+    each group is joined into the groups query instead of being prefetched
+    on its own. With ``project`` those querysets are also narrowed with
+    ``only()`` (see ``build_projection``).
+    """
+    select, prefetch = [], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == "*":
+            lookup = None
+        else:
+            lookup = _lookup(prefix, field.source)
+        if lookup and isinstance(field, serializers.ListSerializer):
+            queryset = build_prefetch_queryset(serializer, field, project)
+            if queryset is None:
+                prefetch.append(lookup)
+            else:
+                prefetch.append(Prefetch(lookup, queryset=queryset))
+        elif lookup and isinstance(field, ManyRelatedField):
+            prefetch.append(lookup)
+        elif lookup and isinstance(field, serializers.Serializer):
+            select.append(lookup)
+            nested_select, nested = build_prefetch_plan(field, lookup, project)
+            select.extend(nested_select)
+            prefetch.extend(nested)
+        else:
+            for relation in _get_relations(serializer, name, field):
+                select.append(_lookup(prefix, relation))
+    return list(dict.fromkeys(select)), list(dict.fromkeys(prefetch))
+
+
+def build_prefetch_queryset(serializer, field, project=False):
+    """
+    Queryset for the ``Prefetch`` of the to-many ``field`` of
+    ``serializer``, or None when its child is not a model serializer
+    """
+    model = getattr(getattr(field.child, "Meta", None), "model", None)
+    if model is None:
+        return None
+    select, prefetch = build_prefetch_plan(field.child, project=project)
+    queryset = model._default_manager.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if not project:
+        return queryset
+    only = build_projection(field.child)
+    relation = _get_model_field(serializer, field.source_attrs[0])
+    if only is None or relation is None or len(field.source_attrs) > 1:
+        return queryset
+    if relation.one_to_many:
+        # The foreign key is read back to attach each row to its parent
+        only.add(relation.field.name)
+    return queryset.only(*only)
+
+
+def build_projection(serializer, prefix=""):
+    """
+    ``only()`` paths for the columns ``serializer`` reads, including those
+    of nested serializers joined with ``select_related``. Returns None when
+    a rendered field cannot be traced back to model fields (add it to
+    ``field_sources`` to allow the projection).
+    """
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    if model is None:
+        return None
+    paths = {_lookup(prefix, model._meta.pk.name)}
+    hints = getattr(serializer, "field_sources", {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in hints:
+            sources = hints[name]
+        elif field.source == "*":
+            return None
+        else:
+            sources = ["__".join(field.source_attrs)]
+
+        for source in sources:
+            first = source.split("__")[0]
+            model_field = _get_model_field(serializer, first)
+            if model_field is None:
+                return None
+            if model_field.many_to_many or model_field.one_to_many:
+                # Loaded by prefetch_related with its own query
+                continue
+            if model_field.concrete:
+                paths.add(_lookup(prefix, first))
+            if isinstance(field, serializers.Serializer) and name not in hints:
+                nested = build_projection(field, _lookup(prefix, source))
+                if nested is not None:
+                    paths.update(nested)
+            elif source != first:
+                paths.add(_lookup(prefix, source))
+    return paths
+
+
+class PrefetchPlanMixin:
+    """
+    ViewSet mixin that applies the prefetch plan of the serializer used by
+    the current request to the queryset. On reads the queryset is also
+    narrowed with ``only()`` to the columns the serializer renders, which
+    follows ``?fields=``/``?omit=`` (see ``core.drf.fieldsets``).
+    """
+
+    def get_prefetch_serializer(self):
+        serializer_class = self.get_serializer_class()
+        return serializer_class(context=self.get_serializer_context())
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer = self.get_prefetch_serializer()
+        project = self.request.method in SAFE_METHODS
+        select, prefetch = build_prefetch_plan(serializer, project=project)
+        if project:
+            only = build_projection(serializer)
+            if only is not None:
+                queryset = queryset.only(*only)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
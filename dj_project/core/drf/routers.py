@@ -0,0 +1,28 @@
+"""
+Routers for the API apps
+"""
+
+from rest_framework.routers import DefaultRouter, Route
+
+
+class BulkRouter(DefaultRouter):
+    """
+    ``DefaultRouter`` that also routes PATCH and DELETE on the list URL to
+    the ``bulk_update``/``bulk_destroy`` methods of viewsets having them
+    (see ``core.drf.bulk.BulkWriteMixin``)
+    """
+
+    routes = [
+        (
+            route._replace(
+                mapping={
+                    **route.mapping,
+                    "patch": "bulk_update",
+                    "delete": "bulk_destroy",
+                }
+            )
+            if isinstance(route, Route) and route.name == "{basename}-list"
+            else route
+        )
+        for route in DefaultRouter.routes
+    ]
@@ -1,12 +1,18 @@
-import os
+import logging
+import posixpath
+from io import BytesIO
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.conf import settings
+from django.core.files.base import ContentFile
 
 
 from django.utils.http import urlsafe_base64_decode
-from PIL import Image
+from PIL import Image, ImageOps, features
+from .media_helper import get_derived, set_derived
+
+logger = logging.getLogger("MainProcess")
 
 
 def generate_reset_link(user):
@@ -28,29 +34,166 @@ def is_token_valid(user, token):
     return default_token_generator.check_token(user, token)
 
 
+def get_thumbnail_key(path, width, height):
+    """
+    ``MediaBlob.derived`` key of the thumbnails made by ``create_thumbnail``
+    """
+    return f"thumbnail:{path}:{width}x{height}"
+
+
+def encode_thumbnail(img, width=40, height=40):
+    """
+    ``img``, an opened but not yet loaded PIL image, reduced to fit in
+    ``width`` x ``height`` and encoded in its own format. JPEGs are decoded
+    at reduced scale via ``Image.draft``.
+    """
+    image_format = img.format
+    img.draft("RGB", (width, height))
+    img.thumbnail((width, height))
+    if image_format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = BytesIO()
+    img.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
 def create_thumbnail(
-    orig_image, source_image, model_instance, path, width=40, height=40
+    orig_image, source_image, model_instance, path, width=40, height=40, save=True
 ):
+    """
+    Create a thumbnail of ``orig_image`` and store it in ``source_image``,
+    saving ``model_instance`` unless ``save`` is False.
+
+    The original is read through its storage backend, so this works the same
+    for local files and for S3, and JPEGs are decoded at reduced scale via
+    ``Image.draft`` instead of at full resolution.
+    """
+    if not orig_image:
+        return
+
+    # Content-addressed uploads keep their thumbnails, a known image is
+    # never decoded twice
+    cache_key = get_thumbnail_key(path, width, height)
+    thumb_name = get_derived(orig_image.name, cache_key)
+    if thumb_name:
+        setattr(model_instance, source_image, thumb_name)
+        if save:
+            model_instance.save(update_fields=[source_image])
+        return
+
+    storage = orig_image.storage
     try:
-        if not orig_image:
-            return
-
-        thumbnail_size = (width, height)
-        img = Image.open(orig_image.path)
-        img.thumbnail(thumbnail_size)
-        thumb_filename = os.path.split(orig_image.name)[1]
-        thumb_dir = os.path.join(settings.MEDIA_ROOT, path)
-        if not os.path.exists(thumb_dir):
-            os.makedirs(thumb_dir)
-
-        thumb_path = os.path.join(thumb_dir, thumb_filename)
-        img.save(thumb_path)
-
-        setattr(model_instance, source_image, os.path.join(path, thumb_filename))
-        model_instance.save(update_fields=["thumbnail"])
-    except Exception as e:
-        if orig_image.url:
-            url = orig_image.url.split("media/")[-1]
-            setattr(model_instance, source_image, url)
-            model_instance.save(update_fields=["thumbnail"])
+        with storage.open(orig_image.name, "rb") as source:
+            content = encode_thumbnail(Image.open(source), width, height)
+
+        thumb_filename = posixpath.basename(orig_image.name)
+        thumb_name = storage.save(
+            posixpath.join(path, thumb_filename), ContentFile(content)
+        )
+        setattr(model_instance, source_image, thumb_name)
+        set_derived(orig_image.name, cache_key, thumb_name)
+    except Exception:
+        logger.exception("Failed to create thumbnail for %s", orig_image.name)
+        # Not the original: uploads are shared and counted (MediaBlob), a
+        # reference from the thumbnail would not be
+        setattr(model_instance, source_image, None)
+    if save:
+        model_instance.save(update_fields=[source_image])
+
+
+DERIVATIVE_ENCODE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 60},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True},
+}
+
+
+def get_derivative_formats():
+    formats = getattr(settings, "IMAGE_DERIVATIVE_FORMATS", ["webp"])
+    return [
+        image_format
+        for image_format in formats
+        if image_format in DERIVATIVE_ENCODE_OPTIONS
+        and features.check({"jpeg": "jpg"}.get(image_format, image_format))
+    ]
+
+
+def _encode_derivatives(orig_image, widths, image_formats):
+    storage = orig_image.storage
+    stem, _ext = posixpath.splitext(orig_image.name)
+    with storage.open(orig_image.name, "rb") as source:
+        img = Image.open(source)
+        if widths:
+            img.draft("RGB", (widths[0], widths[0]))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        img.load()
+
+    sizes = [width for width in widths if width < img.width] or [img.width]
+    formats = {}
+    for width in sizes:
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+        for image_format in image_formats:
+            options = DERIVATIVE_ENCODE_OPTIONS[image_format]
+            frame = img
+            if options["format"] == "JPEG" and img.mode != "RGB":
+                frame = img.convert("RGB")
+            buffer = BytesIO()
+            frame.save(buffer, **options)
+            name = storage.save(
+                f"{stem}_{width}w.{image_format}", ContentFile(buffer.getvalue())
+            )
+            formats.setdefault(image_format, {})[str(width)] = name
+    return formats
+
+
+def create_image_derivatives(orig_image, source_image, model_instance, save=True):
+    """
+    Create resized copies of ``orig_image`` in every configured width and
+    format, stored next to the original, and record them in
+    ``model_instance.image_derivatives[source_image]``, saving
+    ``model_instance`` unless ``save`` is False.
+
+    The original is decoded once; each width is resized from the previous,
+    larger one. Derivatives of content-addressed uploads are reused.
+    """
+    derivatives = dict(model_instance.image_derivatives or {})
+    if not orig_image:
+        derivatives.pop(source_image, None)
+    elif derivatives.get(source_image, {}).get("source") != orig_image.name:
+        widths = sorted(getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", []), reverse=True)
+        image_formats = get_derivative_formats()
+        cache_key = "derivatives:{}:{}".format(
+            ",".join(str(width) for width in widths), ",".join(image_formats)
+        )
+        formats = get_derived(orig_image.name, cache_key)
+        if formats is None:
+            formats = _encode_derivatives(orig_image, widths, image_formats)
+            set_derived(orig_image.name, cache_key, formats)
+        derivatives[source_image] = {"source": orig_image.name, "formats": formats}
+    model_instance.image_derivatives = derivatives
+    if save:
+        model_instance.save(update_fields=["image_derivatives"])
+
+
+def get_srcset(image, source_image, model_instance, request=None):
+    """
+    Returns ``{format: "url 320w, url 640w"}`` for the derivatives of
+    ``image``, ignoring derivatives made from a previous upload.
+    """
+    entry = (model_instance.image_derivatives or {}).get(source_image)
+    if not image or not entry or entry.get("source") != image.name:
+        return {}
 
+    srcset = {}
+    for image_format, names in entry["formats"].items():
+        candidates = []
+        for width, name in sorted(names.items(), key=lambda item: int(item[0])):
+            url = image.storage.url(name)
+            if request:
+                url = request.build_absolute_uri(url)
+            candidates.append(f"{url} {width}w")
+        srcset[image_format] = ", ".join(candidates)
+    return srcset
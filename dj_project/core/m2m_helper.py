@@ -0,0 +1,68 @@
+"""
+Many-to-many helpers
+"""
+
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+
+
+def sync_m2m(instance, field_name, ids):
+    """
+    Make ``instance.<field_name>`` contain exactly ``ids``.
+
+    The difference between the stored and the requested ids is computed in
+    memory and applied with one bulk delete and one bulk insert on the
+    through table, so the number of queries does not grow with the number
+    of relations that change. Unknown ids are ignored. ``m2m_changed`` is
+    sent for the rows removed and added, as ``set()`` would.
+    """
+    manager = getattr(instance, field_name)
+    through = manager.through
+    source = manager.source_field_name
+    target = manager.target_field_name
+    target_column = f"{target}_id"
+    requested = {int(pk) for pk in ids or []}
+
+    with transaction.atomic():
+        current = set(
+            through.objects.filter(**{source: instance.pk}).values_list(
+                target_column, flat=True
+            )
+        )
+        to_remove = current - requested
+        to_add = requested - current
+        if to_add:
+            to_add = set(
+                manager.model._base_manager.filter(pk__in=to_add).values_list(
+                    "pk", flat=True
+                )
+            )
+        if to_remove:
+            through.objects.filter(
+                **{source: instance.pk, f"{target_column}__in": to_remove}
+            ).delete()
+        if to_add:
+            through.objects.bulk_create(
+                [
+                    through(**{f"{source}_id": instance.pk, target_column: pk})
+                    for pk in to_add
+                ],
+                ignore_conflicts=True,
+            )
+    db = router.db_for_write(through, instance=instance)
+    for action, pk_set in (("remove", to_remove), ("add", to_add)):
+        if pk_set:
+            m2m_changed.send(
+                sender=through,
+                action=f"post_{action}",
+                instance=instance,
+                reverse=manager.reverse,
+                model=manager.model,
+                pk_set=pk_set,
+                using=db,
+            )
+    # Drop any prefetched rows so the instance does not serialize stale data
+    getattr(instance, "_prefetched_objects_cache", {}).pop(
+        manager.prefetch_cache_name, None
+    )
+    return to_add, to_remove
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.cache import stats
+
+
+class Command(BaseCommand):
+    help = "Show cache hits and misses per endpoint/namespace across workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Clear the counters afterwards"
+        )
+
+    def handle(self, *args, **options):
+        for namespace, counts in stats.totals().items():
+            self.stdout.write(
+                f"{namespace}: {counts['hits']} hits, {counts['misses']} misses "
+                f"({counts['hit_rate']:.1%} hit rate)"
+            )
+        if options["reset"]:
+            stats.reset()
@@ -0,0 +1,41 @@
+from datetime import timedelta
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.media_helper import get_derived_names
+from core.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = "Delete content-addressed media that is no longer referenced."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Keep unreferenced blobs touched more recently than this",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        blobs = MediaBlob.objects.filter(ref_count__lte=0, date_modified__lt=cutoff)
+        collected = 0
+        for blob in blobs.iterator():
+            names = [blob.name, *get_derived_names(blob.derived)]
+            if options["dry_run"]:
+                self.stdout.write(f"Would delete {', '.join(names)}")
+                continue
+            # Re-check the count so a blob re-used meanwhile is kept
+            deleted, _ = MediaBlob.objects.filter(
+                pk=blob.pk, ref_count__lte=0
+            ).delete()
+            if not deleted:
+                continue
+            # Derived files are stored next to the blob
+            storage = storages[blob.storage]
+            for name in names:
+                storage.delete(name)
+            collected += 1
+        self.stdout.write(f"Collected {collected} media blob(s)")
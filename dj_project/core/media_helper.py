@@ -0,0 +1,121 @@
+"""
+Content-addressed media helpers
+
+Uploads are stored once per distinct content under
+``<upload_to>/<digest[:2]>/<digest><ext>`` and reference counted through
+``MediaBlob``. Blobs nobody points at any more are removed by
+``manage.py collect_media_blobs``.
+"""
+
+import hashlib
+import posixpath
+from django.conf import settings
+from django.core.files.storage import default_storage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import MediaBlob
+
+
+def get_digest(upload):
+    """
+    SHA-256 of ``upload``; taken from the upload handler when available
+    """
+    digest = getattr(upload, "sha256", None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in upload.chunks():
+        hasher.update(chunk)
+    upload.seek(0)
+    return hasher.hexdigest()
+
+
+def get_storage_alias(storage):
+    """
+    Key of ``storage`` in ``settings.STORAGES``
+    """
+    if storage is default_storage:
+        return "default"
+    for alias in settings.STORAGES:
+        if storages[alias] is storage:
+            return alias
+    raise ValueError(f"{storage!r} is not configured in settings.STORAGES")
+
+
+def store_upload(upload, upload_to, storage=None):
+    """
+    Store ``upload`` under its content address and take a reference to it.
+    Identical bytes already stored are reused without writing anything.
+    Returns the storage name to assign to the file field.
+    """
+    storage = storage or default_storage
+    alias = get_storage_alias(storage)
+    digest = get_digest(upload)
+    ext = posixpath.splitext(upload.name)[1].lower()
+    name = posixpath.join(upload_to, digest[:2], f"{digest}{ext}")
+
+    blob = MediaBlob.objects.filter(digest=digest).first()
+    if blob is not None and blob.storage != alias:
+        # Held by another storage: saved as a plain upload, not shared nor
+        # counted, under a name that cannot be taken for the blob's
+        return storage.save(posixpath.join(upload_to, upload.name), upload)
+    if blob is None:
+        name = storage.save(name, upload)
+        try:
+            with transaction.atomic():
+                blob = MediaBlob.objects.create(
+                    digest=digest, name=name, size=upload.size, storage=alias
+                )
+        except IntegrityError:
+            # Stored concurrently by another request, keep theirs
+            blob = MediaBlob.objects.get(digest=digest)
+            if name != blob.name:
+                storage.delete(name)
+
+    MediaBlob.objects.filter(pk=blob.pk).update(
+        ref_count=F("ref_count") + 1, date_modified=timezone.now()
+    )
+    return blob.name
+
+
+def release_upload(name):
+    """
+    Drop a reference to the blob stored as ``name``, if it is one
+    """
+    if name:
+        MediaBlob.objects.filter(name=name).update(
+            ref_count=F("ref_count") - 1, date_modified=timezone.now()
+        )
+
+
+def get_derived(name, key):
+    """
+    Cached value derived from the blob stored as ``name`` (e.g. a thumbnail)
+    """
+    derived = (
+        MediaBlob.objects.filter(name=name).values_list("derived", flat=True).first()
+    )
+    return (derived or {}).get(key)
+
+
+def set_derived(name, key, value):
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+        if blob is not None:
+            blob.derived[key] = value
+            blob.save(update_fields=["derived", "date_modified"])
+
+
+def get_derived_names(value):
+    """
+    All storage names found in a ``MediaBlob.derived`` value
+    """
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = value.values()
+    names = []
+    for item in value or []:
+        names.extend(get_derived_names(item))
+    return names
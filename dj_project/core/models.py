@@ -1 +1,87 @@
 # Abstract/base models
+from django.db import models
+from django.db.models import FileField
+
+
+class SnapshotModelMixin:
+    """
+    Keeps the field values a model instance was loaded with, so changes can
+    be diffed on save without reading the row again.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot = dict(zip(field_names, values))
+        return instance
+
+    def _snapshot_fields(self, fields=None):
+        for field in self._meta.concrete_fields:
+            if fields is not None and field.name not in fields:
+                continue
+            # Skip deferred fields, reading them would hit the database
+            if field.attname not in self.__dict__:
+                continue
+            yield field
+
+    def _snapshot_value(self, field):
+        value = field.value_from_object(self)
+        if isinstance(field, FileField):
+            return value.name
+        return value
+
+    def take_snapshot(self, fields=None):
+        """
+        Store the current values of ``fields`` (all loaded fields by default)
+        """
+        snapshot = getattr(self, "_snapshot", {})
+        for field in self._snapshot_fields(fields):
+            snapshot[field.attname] = self._snapshot_value(field)
+        self._snapshot = snapshot
+
+    def get_changed_fields(self, fields=None):
+        """
+        Return ``{field_name: (old_value, new_value)}`` for the fields that
+        differ from the snapshot. Instances that were not loaded from the
+        database fall back to a single query for the stored values.
+        """
+        snapshot = getattr(self, "_snapshot", None)
+        if snapshot is None:
+            attnames = [field.attname for field in self._snapshot_fields(fields)]
+            snapshot = (
+                type(self)._base_manager.filter(pk=self.pk).values(*attnames).first()
+            )
+            if snapshot is None:
+                return {}
+
+        changes = {}
+        for field in self._snapshot_fields(fields):
+            if field.attname not in snapshot:
+                continue
+            old_value = snapshot[field.attname]
+            new_value = self._snapshot_value(field)
+            if old_value != new_value:
+                changes[field.name] = (old_value, new_value)
+        return changes
+
+
+class MediaBlob(models.Model):
+    """
+    A single stored copy of uploaded bytes, addressed by their SHA-256
+    digest. ``ref_count`` counts the model fields pointing at ``name`` and
+    ``derived`` caches thumbnails/derivatives already made from it, in
+    the same storage.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    # Key in settings.STORAGES of the storage holding the file
+    storage = models.CharField(max_length=50, default="default")
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    derived = models.JSONField(default=dict, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,47 @@
+"""
+Password hashing in a process pool
+
+``make_password`` is slow on purpose (PBKDF2 with a high iteration count),
+so hashing the passwords of a bulk import in the request process would take
+minutes for a few thousand users. ``hash_passwords`` spreads them over
+``PASSWORD_HASH_WORKERS`` processes instead, started once and kept for the
+life of the worker.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# Passwords sent to a process at a time, each takes a fraction of a second
+HASH_CHUNK_SIZE = 8
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    workers = getattr(settings, "PASSWORD_HASH_WORKERS", None)
+    if workers == 0:
+        return None
+    if _executor is None:
+        # Spawned rather than forked, the parent may hold threads and
+        # database connections; each process sets Django up once
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+def hash_passwords(passwords):
+    """
+    ``make_password`` of every item of ``passwords``, in order
+    """
+    executor = get_executor()
+    if executor is None or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    return list(executor.map(make_password, passwords, chunksize=HASH_CHUNK_SIZE))
@@ -0,0 +1,148 @@
+"""
+Ingestion of images from remote urls
+
+An image is downloaded through the pooled ``image_parser`` session, which
+streams it under ``REMOTE_IMAGE_MAX_BYTES`` and rejects non image content
+types, and is kept in memory: no temporary file is written. Its format is
+checked from the header PIL reads on open, the downloaded bytes are stored
+as the original (content-addressed, see ``core.media_helper``) and the
+same opened image is decoded once, at reduced scale, for the thumbnail.
+The thumbnail is recorded as derived from the original, so the image job
+queued afterwards for the responsive derivatives does not make it again.
+"""
+
+import hashlib
+import posixpath
+from io import BytesIO
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from image_parser import ImageCache, ImageManager, SessionLinkParser
+from .helper import encode_thumbnail, get_thumbnail_key
+from .media_helper import get_derived, release_upload, set_derived, store_upload
+
+# Urls fetched concurrently per batch of ``ingest_images``
+BATCH_SIZE = 100
+EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif"}
+# Same as the thumbnails of create_thumbnail
+THUMBNAIL_SIZE = (40, 40)
+
+_parser = None
+
+
+class RemoteImageError(ValueError):
+    """
+    Downloaded content that is not an accepted image
+    """
+
+
+def get_parser():
+    """
+    Link parser shared by the ingestions of this process
+    """
+    global _parser
+    if _parser is None:
+        cache_dir = getattr(settings, "REMOTE_IMAGE_CACHE_DIR", None)
+        parser = SessionLinkParser(cache=ImageCache(cache_dir) if cache_dir else None)
+        parser.max_bytes = getattr(settings, "REMOTE_IMAGE_MAX_BYTES", parser.max_bytes)
+        _parser = parser
+    return _parser
+
+
+def open_image(content):
+    """
+    ``content`` opened with PIL, only its header is read. Raises
+    ``RemoteImageError`` when it is not in ``REMOTE_IMAGE_FORMATS``.
+    """
+    formats = getattr(settings, "REMOTE_IMAGE_FORMATS", list(EXTENSIONS))
+    try:
+        img = Image.open(BytesIO(content))
+    except Image.UnidentifiedImageError as e:
+        raise RemoteImageError("Not a valid image") from e
+    except (OSError, Image.DecompressionBombError) as e:
+        raise RemoteImageError(f"Not a valid image: {e}") from e
+    if img.format not in formats or img.format not in EXTENSIONS:
+        raise RemoteImageError(f"Unsupported image format {img.format}")
+    return img
+
+
+def ingest_image(instance, field_name, content, queue=True):
+    """
+    Store ``content``, the downloaded bytes of an image, in
+    ``instance.<field_name>`` together with its thumbnail when the model
+    lists one in ``thumbnail_fields``, then queue the image job of the field
+    unless ``queue`` is False. Returns the stored name.
+    """
+    # Bodies served from the http cache are memory-mapped
+    content = bytes(content)
+    img = open_image(content)
+    field = instance._meta.get_field(field_name)
+    storage = field.storage
+    upload = ContentFile(content, name=f"remote{EXTENSIONS[img.format]}")
+    upload.sha256 = hashlib.sha256(content).hexdigest()
+    name = store_upload(upload, field.upload_to, storage)
+
+    thumbnail_field, path = getattr(instance, "thumbnail_fields", {}).get(
+        field_name, (None, None)
+    )
+    if thumbnail_field is not None:
+        # Images already stored keep their thumbnail, no decode at all then
+        cache_key = get_thumbnail_key(path, *THUMBNAIL_SIZE)
+        thumb_name = get_derived(name, cache_key)
+        if not thumb_name:
+            try:
+                thumbnail = encode_thumbnail(img, *THUMBNAIL_SIZE)
+            except (OSError, Image.DecompressionBombError) as e:
+                release_upload(name)
+                raise RemoteImageError(f"Not a valid image: {e}") from e
+            thumb_name = storage.save(
+                posixpath.join(path, posixpath.basename(name)), ContentFile(thumbnail)
+            )
+            set_derived(name, cache_key, thumb_name)
+        setattr(instance, thumbnail_field, thumb_name)
+
+    previous = getattr(instance, field_name).name
+    setattr(instance, field_name, name)
+    instance.save()
+    release_upload(previous)
+    if queue:
+        instance.queue_image_job(field_name)
+    return name
+
+
+def _result(instance, field_name, url, name=None, error=None):
+    result = {"id": instance.pk, "field": field_name, "url": url}
+    if error is not None:
+        return {**result, "status": "error", "error": error}
+    return {**result, "status": "ok", "name": name}
+
+
+def ingest_images(targets, concurrency=None, queue=True):
+    """
+    Ingest ``targets``, ``(instance, field_name, url)`` triples, downloading
+    ``BATCH_SIZE`` urls at a time on ``concurrency`` threads. Yields one
+    result per target, in order.
+    """
+    if concurrency is None:
+        concurrency = getattr(settings, "REMOTE_IMAGE_CONCURRENCY", 8)
+    manager = ImageManager(http=get_parser())
+    targets = iter(targets)
+    while batch := list(islice(targets, BATCH_SIZE)):
+        fetched = manager.get_images([url for _, _, url in batch], concurrency)
+        for (instance, field_name, url), result in zip(batch, fetched):
+            if result.error is not None:
+                error = str(result.error) or type(result.error).__name__
+            elif not result.ok:
+                error = "No image at this url"
+            else:
+                try:
+                    name = ingest_image(instance, field_name, result.content, queue)
+                except RemoteImageError as e:
+                    error = str(e)
+                else:
+                    yield _result(instance, field_name, url, name)
+                    continue
+            yield _result(instance, field_name, url, error=error)
@@ -0,0 +1,166 @@
+"""
+Full-text search over a model's ``search_document`` column
+
+The index itself is created by the model's migration, per database:
+
+* PostgreSQL: a GIN index on ``to_tsvector(SEARCH_CONFIG, search_document)``
+* MySQL: a ``FULLTEXT`` index on ``search_document``
+* SQLite: an FTS5 table ``<db_table>_fts`` kept in sync by triggers (for
+  local use; the rank is approximate and a migration that rebuilds the
+  table drops the triggers, so re-create the index after one)
+
+``fulltext_search`` filters a queryset through that index and annotates a
+``search_rank`` (higher is better). Other databases fall back to
+``icontains`` on the document.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = "english"
+DOCUMENT_FIELD = "search_document"
+RANK = "search_rank"
+
+
+def get_fts_table(model):
+    return f"{model._meta.db_table}_fts"
+
+
+def get_terms(text):
+    """
+    Words of ``text`` with operators and quotes stripped, so they can be
+    placed in each backend's query syntax safely
+    """
+    return re.findall(r"\w+", text or "")
+
+
+def _column(connection, model, column=DOCUMENT_FIELD):
+    quote = connection.ops.quote_name
+    return f"{quote(model._meta.db_table)}.{quote(column)}"
+
+
+def _postgresql(connection, model, terms):
+    # Every word is required and matched as a prefix, like on the others
+    document = f"to_tsvector('{SEARCH_CONFIG}', {_column(connection, model)})"
+    query = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+    text = " & ".join(f"'{term}':*" for term in terms)
+    match = RawSQL(f"{document} @@ {query}", [text], output_field=BooleanField())
+    rank = RawSQL(f"ts_rank({document}, {query})", [text], output_field=FloatField())
+    return match, rank
+
+
+def _mysql(connection, model, terms):
+    # Boolean mode: every word is required and matched as a prefix
+    against = " ".join(f"+{term}*" for term in terms)
+    sql = f"MATCH ({_column(connection, model)}) AGAINST (%s IN BOOLEAN MODE)"
+    match = RawSQL(sql, [against], output_field=BooleanField())
+    rank = RawSQL(sql, [against], output_field=FloatField())
+    return match, rank
+
+
+def _sqlite(connection, model, terms):
+    # Every word is required and matched as a prefix
+    query = " ".join(f'"{term}"*' for term in terms)
+    fts = connection.ops.quote_name(get_fts_table(model))
+    pk = _column(connection, model, model._meta.pk.column)
+    match = RawSQL(
+        f"{pk} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)",
+        [query],
+        output_field=BooleanField(),
+    )
+    # bm25() can only be read per row through a correlated MATCH, which
+    # is quadratic on broad queries; as every word is required, shorter
+    # documents are ranked first instead
+    rank = RawSQL(
+        f"-length({_column(connection, model)})", [], output_field=FloatField()
+    )
+    return match, rank
+
+
+BACKENDS = {
+    "postgresql": _postgresql,
+    "mysql": _mysql,
+    "sqlite": _sqlite,
+}
+
+
+def fulltext_search(queryset, text):
+    """
+    Records of ``queryset`` whose document contains every word of ``text``,
+    annotated with ``search_rank``
+    """
+    terms = get_terms(text)
+    if not terms:
+        return queryset
+    connection = connections[queryset.db]
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        for term in terms:
+            queryset = queryset.filter(**{f"{DOCUMENT_FIELD}__icontains": term})
+        return queryset.annotate(**{RANK: Value(1.0, output_field=FloatField())})
+
+    match, rank = backend(connection, queryset.model, terms)
+    return queryset.filter(match).annotate(**{RANK: rank})
+
+
+def create_fulltext_index(schema_editor, model):
+    """
+    Create the full-text index of ``model.search_document`` for the current
+    database, used from migrations
+    """
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+    index = quote(f"{table}_search_idx")
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX {index} ON {quote(table)} USING GIN "
+            f"(to_tsvector('{SEARCH_CONFIG}', {quote(DOCUMENT_FIELD)}))"
+        )
+    elif connection.vendor == "mysql":
+        schema_editor.execute(
+            f"CREATE FULLTEXT INDEX {index} ON {quote(table)} "
+            f"({quote(DOCUMENT_FIELD)})"
+        )
+    elif connection.vendor == "sqlite":
+        fts = quote(get_fts_table(model))
+        pk = quote(model._meta.pk.column)
+        document = quote(DOCUMENT_FIELD)
+        insert = (
+            f"INSERT INTO {fts} (rowid, {document}) "
+            f"VALUES (new.{pk}, new.{document});"
+        )
+        delete = (
+            f"INSERT INTO {fts} ({fts}, rowid, {document}) "
+            f"VALUES ('delete', old.{pk}, old.{document});"
+        )
+        for statement in [
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({document}, "
+            f"content='{table}', content_rowid='{model._meta.pk.column}')",
+            f"CREATE TRIGGER {quote(table + '_fts_ai')} AFTER INSERT ON "
+            f"{quote(table)} BEGIN {insert} END",
+            f"CREATE TRIGGER {quote(table + '_fts_ad')} AFTER DELETE ON "
+            f"{quote(table)} BEGIN {delete} END",
+            f"CREATE TRIGGER {quote(table + '_fts_au')} AFTER UPDATE ON "
+            f"{quote(table)} BEGIN {delete} {insert} END",
+            f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+        ]:
+            schema_editor.execute(statement)
+
+
+def drop_fulltext_index(schema_editor, model):
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+    index = quote(f"{table}_search_idx")
+    if connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX {index}")
+    elif connection.vendor == "mysql":
+        schema_editor.execute(f"DROP INDEX {index} ON {quote(table)}")
+    elif connection.vendor == "sqlite":
+        for suffix in ["_fts_ai", "_fts_ad", "_fts_au"]:
+            schema_editor.execute(f"DROP TRIGGER {quote(table + suffix)}")
+        schema_editor.execute(f"DROP TABLE {quote(get_fts_table(model))}")
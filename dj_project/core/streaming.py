@@ -0,0 +1,131 @@
+"""
+NDJSON and CSV streams for the bulk endpoints
+
+Request bodies are read line by line from the request stream and responses
+are written through a ``StreamingHttpResponse``, so neither an import nor
+an export ever holds the whole data set in memory.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+FORMATS = {"ndjson": NDJSON, "csv": CSV}
+EXTENSIONS = {NDJSON: "ndjson", CSV: "csv"}
+
+# Rows joined into one chunk of the response
+WRITE_CHUNK_SIZE = 500
+
+
+def _read_lines(request):
+    stream = request.stream
+    if stream is None:
+        return
+    for number, line in enumerate(stream, start=1):
+        line = line.decode("utf-8", errors="replace")
+        yield line.lstrip("\ufeff") if number == 1 else line
+
+
+def read_rows(request):
+    """
+    Yield ``(line_number, row, error)`` for each row of the NDJSON or CSV
+    (``Content-Type: text/csv``) body of ``request``, see ``parse_rows``
+    """
+    return parse_rows(_read_lines(request), request.content_type)
+
+
+def parse_rows(lines, content_type=NDJSON):
+    """
+    Yield ``(line_number, row, error)`` for each row of ``lines`` (text),
+    NDJSON or CSV. ``row`` is a dict, or None when the line could not be
+    parsed and ``error`` says why. Empty CSV cells are left out of the row.
+    """
+    if content_type == CSV:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            row = {
+                name: value
+                for name, value in row.items()
+                if name is not None and value not in ("", None)
+            }
+            yield reader.line_num, row, None
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, row, None
+
+
+def get_output_format(request, param="output"):
+    """
+    Content type asked with ``?output=ndjson|csv``, NDJSON by default
+    """
+    return FORMATS.get(request.query_params.get(param), NDJSON)
+
+
+def iter_ndjson(items):
+    for item in items:
+        yield json.dumps(item, cls=DjangoJSONEncoder) + "\n"
+
+
+class _Echo:
+    """File-like object returning what is written, for ``csv.writer``"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(rows, fields, content_type):
+    """
+    Serialize ``rows`` (value tuples in the order of ``fields``) as
+    ``content_type``, yielding chunks of ``WRITE_CHUNK_SIZE`` rows
+    """
+    if content_type == CSV:
+        writer = csv.writer(_Echo())
+        header = writer.writerow(fields)
+        lines = (writer.writerow(row) for row in rows)
+    else:
+        header = ""
+        lines = iter_ndjson(dict(zip(fields, row)) for row in rows)
+
+    chunk = [header]
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= WRITE_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_response(rows, fields, content_type, filename):
+    """
+    Streamed download of ``rows`` as ``<filename>.ndjson`` or ``.csv``
+    """
+    response = StreamingHttpResponse(
+        iter_rows(rows, fields, content_type), content_type=content_type
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{EXTENSIONS[content_type]}"'
+    )
+    return response
+
+
+def ndjson_response(items):
+    """
+    Stream ``items`` (JSON serializable dicts) as NDJSON as they are made
+    """
+    return StreamingHttpResponse(iter_ndjson(items), content_type=NDJSON)
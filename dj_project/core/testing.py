@@ -0,0 +1,64 @@
+"""
+Helpers shared by the test modules of the project
+"""
+
+import tempfile
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase as BaseTestCase, override_settings
+
+# Local memory for both tiers, see core.cache.get_shared
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared",
+    },
+}
+
+
+def create_user(username, **fields):
+    """
+    User named ``username``, with an email made from it unless given
+    """
+    fields.setdefault("email", f"{username}@example.com")
+    return get_user_model().objects.create(username=username, **fields)
+
+
+def get_temp_dir(test):
+    """
+    Path of a temporary directory removed once ``test`` is done
+    """
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    return directory.name
+
+
+@override_settings(CACHES=TEST_CACHES, THUMBNAIL_JOB_WORKERS=0)
+class TestCase(BaseTestCase):
+    """
+    Empty caches for each test, and image jobs left queued instead of run
+    by the in-process pool
+    """
+
+    def setUp(self):
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
+
+
+class APITestCase(TestCase):
+    """
+    Logged in as a superuser
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "x"
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
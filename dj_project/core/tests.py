@@ -0,0 +1,45 @@
+import os
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from .media_helper import release_upload, store_upload
+from .models import MediaBlob
+from .testing import get_temp_dir
+
+
+class CollectMediaBlobsTests(TestCase):
+    def setUp(self):
+        location = get_temp_dir(self)
+        self.enterContext(
+            override_settings(
+                STORAGES={
+                    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+                    "staticfiles": {
+                        "BACKEND": "django.core.files.storage.InMemoryStorage"
+                    },
+                    "media": {
+                        "BACKEND": "django.core.files.storage.FileSystemStorage",
+                        "OPTIONS": {"location": location},
+                    },
+                }
+            )
+        )
+
+    def test_collects_from_blob_storage(self):
+        storage = storages["media"]
+        name = store_upload(ContentFile(b"photo", name="photo.jpg"), "pics/", storage)
+        thumbnail = storage.save("thumbs/photo.jpg", ContentFile(b"thumb"))
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.storage, "media")
+        blob.derived = {"thumbnail": thumbnail}
+        blob.save()
+        release_upload(name)
+        MediaBlob.objects.update(date_modified=timezone.now() - timedelta(days=2))
+
+        call_command("collect_media_blobs", stdout=open(os.devnull, "w"))
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(storage.exists(thumbnail))
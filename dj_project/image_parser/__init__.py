@@ -1,6 +1,42 @@
-from .src.app import ImageManager
+from .src.app import AsyncImageManager, ImageManager
+from .src.batch import ImageResult
+from .src.cache import ImageCache
+from .src.parser import AsyncLinkParser, SessionLinkParser
+from .src.exceptions import (
+    ImageParserResponseError,
+    ImageParserTimeout,
+    ImageTooLarge,
+    InvalidContentType,
+)
+
+# Shared by every call so that fetches reuse the pooled connections
+_http = SessionLinkParser()
+_async_http = AsyncLinkParser()
+
+
+def set_cache(cache):
+    """
+    ``ImageCache`` used by the functions below, None to disable it
+    """
+    _http.cache = cache
+    _async_http.cache = cache
 
 
 def get_image(url):
-    app = ImageManager(url)
+    app = ImageManager(url, http=_http)
     return app.get_image()
+
+
+def get_images(urls, concurrency=8, per_host=None, deadline=None):
+    app = ImageManager(http=_http)
+    return app.get_images(urls, concurrency, per_host, deadline)
+
+
+async def aget_image(url):
+    app = AsyncImageManager(url, http=_async_http)
+    return await app.get_image()
+
+
+async def aget_images(urls, concurrency=8, per_host=None, deadline=None):
+    app = AsyncImageManager(http=_async_http)
+    return await app.get_images(urls, concurrency, per_host, deadline)
@@ -2,9 +2,15 @@
 Image Downloader
 """
 
+import asyncio
+import time
 from abc import abstractmethod, ABC
-from .parser import RequestLinkParser
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait
+from .batch import HostLimits, ImageResult
+from .parser import AsyncLinkParser, SessionLinkParser
 from .exceptions.attribute import ImageParserAttribute
+from .exceptions.response import ImageParserTimeout
 
 
 class ImageManagerAbstract(ABC):
@@ -35,24 +41,83 @@ class ImageManagerBase(ImageManagerAbstract):
     Base Image Utility Class
     """
 
-    def __init__(self) -> None:
-        self.http = self.get_http()
+    def __init__(self, http=None) -> None:
+        self.http = http if http is not None else self.get_http()
 
     def get_http(self):
         if not self.http_class:
             raise ImageParserAttribute("http_class is required")
         return self.http_class()
 
+    def get_host_limit(self, concurrency):
+        """
+        Default per host limit of a batch, no more than the connections
+        the http class keeps per host
+        """
+        pool_maxsize = getattr(self.http, "pool_maxsize", None)
+        return min(concurrency, pool_maxsize) if pool_maxsize else concurrency
+
+    def fetch(self, url, limits, deadline=None):
+        """
+        ``ImageResult`` of one url of a batch
+        """
+        semaphore = limits.get(url)
+        if semaphore is not None:
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0)
+            if not semaphore.acquire(timeout=timeout):
+                return ImageResult(url, error=ImageParserTimeout(url))
+        try:
+            return ImageResult(url, self.http.get_content(url))
+        except Exception as e:  # pylint: disable=broad-except
+            # Recorded against the url, one failure must not stop the batch
+            return ImageResult(url, error=e)
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def get_images(self, urls, concurrency=8, per_host=None, deadline=None):
+        """
+        Fetch ``urls`` on ``concurrency`` threads, with at most ``per_host``
+        requests to one host at once. Returns one ``ImageResult`` per url,
+        in order; urls not fetched within ``deadline`` seconds get an
+        ``ImageParserTimeout`` error.
+        """
+        urls = list(urls)
+        if per_host is None:
+            per_host = self.get_host_limit(concurrency)
+        limits = HostLimits(per_host)
+        end = None if deadline is None else time.monotonic() + deadline
+        results = [None] * len(urls)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            futures = {
+                executor.submit(self.fetch, url, limits, end): index
+                for index, url in enumerate(urls)
+            }
+            done, _ = wait(futures, timeout=deadline)
+        finally:
+            # Requests already sent finish in the background, their results
+            # are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+        for future in done:
+            results[futures[future]] = future.result()
+        for index, url in enumerate(urls):
+            if results[index] is None:
+                results[index] = ImageResult(url, error=ImageParserTimeout(url))
+        return results
+
 
 class ImageManager(ImageManagerBase):
     """
     Image Utility
     """
 
-    http_class = RequestLinkParser
+    http_class = SessionLinkParser
 
-    def __init__(self, url) -> None:
-        super().__init__()
+    def __init__(self, url=None, http=None) -> None:
+        super().__init__(http)
         self.url = url
 
     def get_url(self):
@@ -62,8 +127,55 @@ class ImageManager(ImageManagerBase):
         """
         Retreive image content
         """
-        url = self.get_url()
-        response = self.http.get(url)
-        if response.status_code == 200:
-            return response.content
-        return
+        return self.http.get_content(self.get_url())
+
+
+class AsyncImageManager(ImageManager):
+    """
+    Image Utility for async code, fetches on the running event loop
+    """
+
+    http_class = AsyncLinkParser
+
+    async def get_image(self):
+        """
+        Retreive image content
+        """
+        return await self.http.get_content(self.get_url())
+
+    async def fetch(self, url, limits, concurrency):
+        async with limits.get(url) or nullcontext(), concurrency:
+            try:
+                return ImageResult(url, await self.http.get_content(url))
+            except Exception as e:  # pylint: disable=broad-except
+                # Cancellation at the deadline is not an Exception and
+                # still goes through
+                return ImageResult(url, error=e)
+
+    async def get_images(self, urls, concurrency=8, per_host=None, deadline=None):
+        """
+        Same as ``ImageManagerBase.get_images`` with tasks instead of threads
+        """
+        urls = list(urls)
+        if per_host is None:
+            per_host = self.get_host_limit(concurrency)
+        limits = HostLimits(per_host, asyncio.BoundedSemaphore)
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = [
+            asyncio.ensure_future(self.fetch(url, limits, semaphore)) for url in urls
+        ]
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+        return [
+            (
+                task.result()
+                if not task.cancelled()
+                else ImageResult(url, error=ImageParserTimeout(url))
+            )
+            for url, task in zip(urls, tasks)
+        ]
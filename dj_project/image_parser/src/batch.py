@@ -0,0 +1,47 @@
+"""
+Helpers of batch image fetching
+"""
+
+import threading
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+
+@dataclass
+class ImageResult:
+    """
+    Outcome of fetching one url of a batch. ``content`` (bytes, or an mmap
+    when served from the cache) is None when the url gave no image,
+    ``error`` holds the exception that stopped it, if any.
+    """
+
+    url: str
+    content: bytes = None
+    error: BaseException = None
+
+    @property
+    def ok(self):
+        return self.content is not None
+
+
+class HostLimits:
+    """
+    One semaphore per host, so that at most ``limit`` requests of a batch
+    run against the same host at once. No limit when ``limit`` is None.
+    """
+
+    def __init__(self, limit=None, semaphore_class=threading.BoundedSemaphore):
+        self.limit = limit
+        self.semaphore_class = semaphore_class
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        if self.limit is None:
+            return None
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            semaphore = self.semaphores.get(host)
+            if semaphore is None:
+                semaphore = self.semaphores[host] = self.semaphore_class(self.limit)
+        return semaphore
@@ -0,0 +1,247 @@
+"""
+On-disk HTTP cache of fetched images
+
+Bodies are stored one file per url under ``directory`` and read back
+memory-mapped. Their validators (``ETag``/``Last-Modified``), expiry
+(``Cache-Control: max-age``), size and last access live in a sqlite index
+next to them, which gives the least recently used entries to evict once
+the bodies take more than ``max_size`` bytes.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires REAL NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def get_freshness(headers):
+    """
+    ``(storable, max_age)`` from the ``Cache-Control`` of ``headers``,
+    ``max_age`` is 0 when the response must be revalidated on each use
+    """
+    cache_control = headers.get("Cache-Control", "").lower()
+    directives = {part.strip() for part in cache_control.split(",")}
+    if "no-store" in directives:
+        return False, 0
+    if "no-cache" in directives:
+        return True, 0
+    match = MAX_AGE.search(cache_control)
+    return True, int(match.group(1)) if match else 0
+
+
+@dataclass
+class CacheEntry:
+    """
+    Index row of one cached url
+    """
+
+    key: str
+    url: str
+    etag: str = None
+    last_modified: str = None
+    expires: float = 0
+    size: int = 0
+
+    @property
+    def fresh(self):
+        return self.expires > time.time()
+
+
+class ImageCache:
+    """
+    Cache of image bodies keyed by url. Safe to share between threads, and
+    between processes using the same directory.
+    """
+
+    def __init__(self, directory, max_size=512 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.local = threading.local()
+        os.makedirs(directory, exist_ok=True)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+    @property
+    def connection(self):
+        """
+        Index connection of the current thread
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                os.path.join(self.directory, "index.sqlite3"), timeout=30
+            )
+            self.local.connection = connection
+        return connection
+
+    def get_key(self, url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, url):
+        """
+        ``CacheEntry`` of ``url``, None when it is not cached
+        """
+        key = self.get_key(url)
+        row = self.connection.execute(
+            "SELECT url, etag, last_modified, expires, size FROM entries"
+            " WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None or row[0] != url:
+            return None
+        return CacheEntry(key, *row)
+
+    def open(self, entry):
+        """
+        Body of ``entry``, memory-mapped, marked as just used. None when
+        the file is gone (evicted meanwhile).
+        """
+        try:
+            with open(self.get_path(entry.key), "rb") as file:
+                content = (
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                    if entry.size
+                    else b""
+                )
+        except FileNotFoundError:
+            self.delete(entry.key)
+            return None
+        with self.connection:
+            self.connection.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?",
+                (time.time(), entry.key),
+            )
+        return content
+
+    def get_conditional_headers(self, entry):
+        """
+        Headers revalidating ``entry``, empty when there is none
+        """
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url, content, headers):
+        """
+        Cache ``content``, the body of a 200 response with ``headers``,
+        when they allow it
+        """
+        storable, max_age = get_freshness(headers)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not storable or not (max_age or etag or last_modified):
+            return
+        if len(content) > self.max_size:
+            return
+        key = self.get_key(url)
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed so that readers never see half a file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (key, url, etag, last_modified, expires, size, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, now + max_age, len(content), now),
+            )
+        self.evict()
+
+    def revalidated(self, entry, headers):
+        """
+        Body of ``entry`` after a 304 with ``headers``, which renew its
+        expiry and validators. None when the body is gone.
+        """
+        storable, max_age = get_freshness(headers)
+        if not storable:
+            content = self.open(entry)
+            self.delete(entry.key)
+            return content
+        with self.connection:
+            self.connection.execute(
+                "UPDATE entries SET etag = ?, last_modified = ?, expires = ?"
+                " WHERE key = ?",
+                (
+                    headers.get("ETag") or entry.etag,
+                    headers.get("Last-Modified") or entry.last_modified,
+                    time.time() + max_age,
+                    entry.key,
+                ),
+            )
+        return self.open(entry)
+
+    def delete(self, key):
+        with self.connection:
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.unlink(self.get_path(key))
+        except FileNotFoundError:
+            pass
+
+    def get_size(self):
+        (size,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return size
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the bodies fit in
+        ``max_size``
+        """
+        excess = self.get_size() - self.max_size
+        if excess <= 0:
+            return
+        rows = self.connection.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        )
+        keys = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            keys.append(key)
+            excess -= size
+        for key in keys:
+            self.delete(key)
+
+    def clear(self):
+        with self.connection:
+            keys = [
+                key for (key,) in self.connection.execute("SELECT key FROM entries")
+            ]
+        for key in keys:
+            self.delete(key)
@@ -1 +1,2 @@
 from .attribute import *
+from .response import *
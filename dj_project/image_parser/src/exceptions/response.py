@@ -0,0 +1,27 @@
+"""
+Response Exception file
+"""
+
+
+class ImageParserResponseError(ValueError):
+    """
+    Response that cannot be used as an image
+    """
+
+
+class ImageTooLarge(ImageParserResponseError):
+    """
+    Body larger than the parser's max_bytes
+    """
+
+
+class InvalidContentType(ImageParserResponseError):
+    """
+    Content type not in the parser's allowed_content_types
+    """
+
+
+class ImageParserTimeout(TimeoutError):
+    """
+    Deadline of a batch reached before the image was fetched
+    """
@@ -1 +1,2 @@
 from .linkparser import *
+from .asyncparser import *
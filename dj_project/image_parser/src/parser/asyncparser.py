@@ -0,0 +1,120 @@
+import asyncio
+import weakref
+import httpx
+from .linkparser import BaseLinkParser, HTTPCacheMixin, ResponseLimitsMixin
+
+
+class AsyncLinkParser(HTTPCacheMixin, ResponseLimitsMixin, BaseLinkParser):
+    """
+    Use httpx on the running event loop. ``get`` and ``get_content`` are
+    coroutines; one client, and so one connection pool, is shared by the
+    instances of the class running on the same loop. Same retries, limits
+    and cache as ``SessionLinkParser``.
+    """
+
+    http_lib = httpx
+    max_connections = 100
+    max_keepalive_connections = 20
+    # Default per host limit of a batch, see ImageManagerBase.get_host_limit
+    pool_maxsize = 10
+    max_retries = 3
+    backoff_factor = 0.5
+    retry_statuses = (429, 500, 502, 503, 504)
+    connect_timeout = 5
+    timeout = 10
+
+    # {loop: {class: client}}
+    _clients = weakref.WeakKeyDictionary()
+
+    def create_client(self):
+        return self.http_lib.AsyncClient(
+            limits=self.http_lib.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+            ),
+            timeout=self.http_lib.Timeout(self.timeout, connect=self.connect_timeout),
+            follow_redirects=True,
+        )
+
+    def get_client(self):
+        """
+        Client of this class for the running loop, created on first use
+        """
+        clients = self._clients.setdefault(asyncio.get_running_loop(), {})
+        client = clients.get(type(self))
+        if client is None or client.is_closed:
+            client = clients[type(self)] = self.create_client()
+        return client
+
+    @classmethod
+    async def aclose(cls):
+        """
+        Close the pooled connections of this class on the running loop
+        """
+        clients = cls._clients.get(asyncio.get_running_loop(), {})
+        client = clients.pop(cls, None)
+        if client is not None:
+            await client.aclose()
+
+    def get_backoff(self, attempt):
+        return self.backoff_factor * 2**attempt
+
+    async def get(self, url):
+        return await self.get_client().get(url)
+
+    async def read(self, response):
+        """
+        Body of a streamed response, at most ``max_bytes`` long
+        """
+        self.check_length(response)
+        body = bytearray()
+        async for chunk in response.aiter_bytes(self.chunk_size):
+            body += chunk
+            self.check_size(response, len(body))
+        return bytes(body)
+
+    async def get_content(self, url):
+        """
+        Body of a successful response, None otherwise. Raises
+        ``InvalidContentType`` or ``ImageTooLarge`` when it is not an
+        acceptable image. Cached bodies are memory-mapped.
+        """
+        entry = content = None
+        if self.cache is not None:
+            # The cache index and bodies are on disk, they are read off the
+            # loop like they are written
+            entry = await asyncio.to_thread(self.get_cache_entry, url)
+            content = await asyncio.to_thread(self.get_fresh, entry)
+        if content is not None:
+            return content
+        headers = self.get_request_headers(entry)
+        client = self.get_client()
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and entry is not None:
+                        content = await asyncio.to_thread(
+                            self.get_revalidated, entry, response
+                        )
+                        # See SessionLinkParser.get_content
+                        return (
+                            content
+                            if content is not None
+                            else await self.get_content(url)
+                        )
+                    if last or response.status_code not in self.retry_statuses:
+                        if response.status_code != 200:
+                            return None
+                        self.check_content_type(response)
+                        content = await self.read(response)
+                        # Writing the body would block the loop
+                        await asyncio.to_thread(
+                            self.cache_content, url, response, content
+                        )
+                        return content
+            except self.http_lib.TransportError:
+                if last:
+                    raise
+            await asyncio.sleep(self.get_backoff(attempt))
+        return None
@@ -1,5 +1,9 @@
 from abc import abstractmethod, ABC
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ..exceptions.response import ImageTooLarge, InvalidContentType
 
 
 class LinkParserAbstract(ABC):
@@ -21,6 +25,15 @@ class BaseLinkParser(LinkParserAbstract):
     Base class for link parser
     """
 
+    def get_content(self, url):
+        """
+        Body of a successful response, None otherwise
+        """
+        response = self.get(url)
+        if response.status_code == 200:
+            return response.content
+        return None
+
 
 class RequestLinkParser(BaseLinkParser):
     """
@@ -32,3 +45,177 @@ class RequestLinkParser(BaseLinkParser):
 
     def get(self, url):
         return self.http_lib.get(url, timeout=self.timeout)
+
+
+class ResponseLimitsMixin:
+    """
+    Checks of streamed responses shared by the link parsers
+    """
+
+    max_bytes = 10 * 1024 * 1024
+    # Prefixes matched against the Content-Type header
+    allowed_content_types = ("image/",)
+    chunk_size = 64 * 1024
+
+    def check_content_type(self, response):
+        content_type = response.headers.get("Content-Type", "").lower()
+        if not content_type.startswith(self.allowed_content_types):
+            raise InvalidContentType(
+                f"{response.url}: content type {content_type or 'missing'!r}"
+            )
+
+    def check_length(self, response):
+        """
+        Reject a response announcing more than ``max_bytes``
+        """
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise ImageTooLarge(
+                f"{response.url}: {length} bytes, more than {self.max_bytes}"
+            )
+
+    def check_size(self, response, size):
+        if size > self.max_bytes:
+            raise ImageTooLarge(f"{response.url}: more than {self.max_bytes} bytes")
+
+
+class HTTPCacheMixin:
+    """
+    Optional ``image_parser.src.cache.ImageCache`` of the link parsers,
+    given to the constructor or set on the class
+    """
+
+    cache = None
+
+    def __init__(self, cache=None) -> None:
+        if cache is not None:
+            self.cache = cache
+
+    def get_cache_entry(self, url):
+        return self.cache.get(url) if self.cache is not None else None
+
+    def get_fresh(self, entry):
+        """
+        Cached body of ``entry`` when it can be used without a request
+        """
+        if entry is not None and entry.fresh:
+            return self.cache.open(entry)
+        return None
+
+    def get_request_headers(self, entry):
+        if entry is None:
+            return {}
+        return self.cache.get_conditional_headers(entry)
+
+    def cache_content(self, url, response, content):
+        if self.cache is not None:
+            self.cache.store(url, content, response.headers)
+
+    def get_revalidated(self, entry, response):
+        return self.cache.revalidated(entry, response.headers)
+
+
+class SessionLinkParser(HTTPCacheMixin, ResponseLimitsMixin, RequestLinkParser):
+    """
+    Requests through a keep-alive session shared by every instance of the
+    class, so repeated fetches reuse pooled connections. Failed connections
+    and ``retry_statuses`` are retried with exponential backoff, and bodies
+    are streamed so that ``max_bytes`` and ``allowed_content_types`` are
+    checked before the whole image is held in memory. With a ``cache``,
+    fresh bodies are served from it and stale ones revalidated.
+    """
+
+    # Hosts kept in the pool, and connections kept per host
+    pool_connections = 10
+    pool_maxsize = 10
+    max_retries = 3
+    backoff_factor = 0.5
+    retry_statuses = (429, 500, 502, 503, 504)
+    # (connect, read) seconds
+    timeout = (5, 10)
+
+    _sessions = {}
+    _lock = threading.Lock()
+
+    def get_retry(self):
+        return Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=("GET", "HEAD"),
+            raise_on_status=False,
+        )
+
+    def create_session(self):
+        session = self.http_lib.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self.get_retry(),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_session(self):
+        """
+        Session of this class, created on first use
+        """
+        cls = type(self)
+        with self._lock:
+            session = self._sessions.get(cls)
+            if session is None:
+                session = self._sessions[cls] = self.create_session()
+        return session
+
+    @classmethod
+    def close(cls):
+        """
+        Close the pooled connections of this class
+        """
+        with cls._lock:
+            session = cls._sessions.pop(cls, None)
+        if session is not None:
+            session.close()
+
+    def get(self, url, stream=False, headers=None):
+        return self.get_session().get(
+            url, timeout=self.timeout, stream=stream, headers=headers
+        )
+
+    def read(self, response):
+        """
+        Body of a streamed response, at most ``max_bytes`` long
+        """
+        self.check_length(response)
+        body = bytearray()
+        for chunk in response.iter_content(self.chunk_size):
+            body += chunk
+            self.check_size(response, len(body))
+        return bytes(body)
+
+    def get_content(self, url):
+        """
+        Body of a successful response, None otherwise. Raises
+        ``InvalidContentType`` or ``ImageTooLarge`` when it is not an
+        acceptable image. Cached bodies are memory-mapped.
+        """
+        entry = self.get_cache_entry(url)
+        content = self.get_fresh(entry)
+        if content is not None:
+            return content
+        headers = self.get_request_headers(entry)
+        # Closing the response hands its connection back to the pool
+        with self.get(url, stream=True, headers=headers) as response:
+            if response.status_code == 304 and entry is not None:
+                content = self.get_revalidated(entry, response)
+            elif response.status_code != 200:
+                return None
+            else:
+                self.check_content_type(response)
+                content = self.read(response)
+                self.cache_content(url, response, content)
+                return content
+        # The body of a revalidated entry can have been evicted meanwhile,
+        # the entry is gone then and it is fetched again
+        return content if content is not None else self.get_content(url)
@@ -0,0 +1,257 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from urllib.parse import parse_qs
+
+from core.testing import get_temp_dir
+
+from .src.app import AsyncImageManager, ImageManager
+from .src.cache import ImageCache
+from .src.exceptions import ImageParserTimeout, InvalidContentType
+from .src.parser import AsyncLinkParser, SessionLinkParser
+
+DELAY = 0.2
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """
+    ``/image/<name>`` is an image, ``/text`` is not, anything else is a 404.
+    ``?delay=<seconds>`` holds the response back. ``/cached/<name>`` is an
+    image fresh for ``?max_age=<seconds>``, with an ETag it answers a 304 to.
+    """
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        params = parse_qs(query)
+        delay = float(params.get("delay", ["0"])[0])
+        self.server.enter(path)
+        try:
+            time.sleep(delay)
+        finally:
+            # Left before the response is sent, so that the next request of
+            # the client never overlaps this one
+            self.server.leave()
+        if path.startswith("/cached/"):
+            self.respond_cached(path, params.get("max_age", ["0"])[0])
+        elif path.startswith("/image/"):
+            self.respond(200, "image/png", path.encode())
+        elif path == "/text":
+            self.respond(200, "text/plain", b"text")
+        else:
+            self.respond(404, "text/plain", b"")
+
+    def respond_cached(self, path, max_age):
+        headers = {"Cache-Control": f"max-age={max_age}", "ETag": f'"{path}"'}
+        if self.headers.get("If-None-Match") == headers["ETag"]:
+            self.server.not_modified[path] += 1
+            self.respond(304, "image/png", b"", headers)
+        else:
+            self.respond(200, "image/png", path.encode(), headers)
+
+    def respond(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class ImageServer(ThreadingHTTPServer):
+    """
+    Counts the requests per path and the most requests served at once
+    """
+
+    def __init__(self, handler_class):
+        super().__init__(("127.0.0.1", 0), handler_class)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.hits = Counter()
+            self.not_modified = Counter()
+            self.active = 0
+            self.max_active = 0
+
+    def enter(self, path):
+        with self.lock:
+            self.hits[path] += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on the requests cancelled at a deadline
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class ServerTestCase(TestCase):
+    """
+    Runs an ``ImageServer`` on a free local port for the tests of the class
+    """
+
+    handler_class = ImageHandler
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ImageServer(cls.handler_class)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.reset()
+
+    def get_url(self, path, delay=None):
+        host, port = self.server.server_address
+        url = f"http://{host}:{port}{path}"
+        return url if delay is None else f"{url}?delay={delay}"
+
+
+class ImageManagerTests(ServerTestCase):
+    def get_images(self, urls, **kwargs):
+        return ImageManager(http=SessionLinkParser()).get_images(urls, **kwargs)
+
+    def test_order(self):
+        # Later urls answer first
+        urls = [self.get_url(f"/image/{i}", DELAY * (3 - i) / 3) for i in range(3)]
+        results = self.get_images(urls, concurrency=3)
+        self.assertEqual([result.url for result in results], urls)
+        self.assertEqual(
+            [result.content for result in results],
+            [b"/image/0", b"/image/1", b"/image/2"],
+        )
+
+    def test_errors(self):
+        urls = [
+            self.get_url("/image/a"),
+            self.get_url("/missing"),
+            self.get_url("/text"),
+        ]
+        image, missing, text = self.get_images(urls)
+        self.assertTrue(image.ok)
+        self.assertIsNone(image.error)
+        # A 404 is no image, not an error
+        self.assertFalse(missing.ok)
+        self.assertIsNone(missing.error)
+        self.assertFalse(text.ok)
+        self.assertIsInstance(text.error, InvalidContentType)
+
+    def test_deadline(self):
+        urls = [self.get_url("/image/fast"), self.get_url("/image/slow", 5 * DELAY)]
+        start = time.monotonic()
+        fast, slow = self.get_images(urls, deadline=DELAY)
+        self.assertLess(time.monotonic() - start, 5 * DELAY)
+        self.assertTrue(fast.ok)
+        self.assertFalse(slow.ok)
+        self.assertIsInstance(slow.error, ImageParserTimeout)
+
+    def test_per_host(self):
+        urls = [self.get_url(f"/image/{i}", DELAY / 2) for i in range(6)]
+        results = self.get_images(urls, concurrency=6, per_host=2)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(self.server.max_active, 2)
+
+    def test_concurrency(self):
+        urls = [self.get_url(f"/image/{i}", DELAY) for i in range(6)]
+        start = time.monotonic()
+        self.get_images(urls, concurrency=1)
+        serial = time.monotonic() - start
+        self.assertEqual(self.server.max_active, 1)
+        start = time.monotonic()
+        results = self.get_images(urls, concurrency=6)
+        concurrent = time.monotonic() - start
+        self.assertTrue(all(result.ok for result in results))
+        self.assertGreaterEqual(serial, 6 * DELAY)
+        self.assertLess(concurrent, 3 * DELAY)
+
+
+class AsyncImageManagerTests(ImageManagerTests):
+    def get_images(self, urls, **kwargs):
+        async def get_images():
+            try:
+                manager = AsyncImageManager(http=AsyncLinkParser())
+                return await manager.get_images(urls, **kwargs)
+            finally:
+                await AsyncLinkParser.aclose()
+
+        return asyncio.run(get_images())
+
+
+class LinkParserCacheTests(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        # Room for two bodies of /cached/<one letter>
+        self.cache = ImageCache(get_temp_dir(self), max_size=20)
+
+    def get_contents(self, urls):
+        parser = SessionLinkParser(cache=self.cache)
+        return [bytes(parser.get_content(url)) for url in urls]
+
+    def test_max_age(self):
+        url = f"{self.get_url('/cached/a')}?max_age=60"
+        self.assertEqual(self.get_contents([url, url]), [b"/cached/a"] * 2)
+        self.assertEqual(self.server.hits["/cached/a"], 1)
+
+    def test_revalidation(self):
+        url = self.get_url("/cached/a")
+        self.assertEqual(self.get_contents([url, url]), [b"/cached/a"] * 2)
+        self.assertEqual(self.server.hits["/cached/a"], 2)
+        self.assertEqual(self.server.not_modified["/cached/a"], 1)
+
+    def test_lru_eviction(self):
+        a, b, c = (f"{self.get_url(f'/cached/{name}')}?max_age=60" for name in "abc")
+        # a is used again after b, b goes when c comes in
+        self.get_contents([a, b, a, c])
+        self.assertIsNotNone(self.cache.get(a))
+        self.assertIsNone(self.cache.get(b))
+        self.assertIsNotNone(self.cache.get(c))
+        self.assertEqual(self.server.hits["/cached/a"], 1)
+
+
+class AsyncLinkParserCacheTests(LinkParserCacheTests):
+    def get_contents(self, urls):
+        async def get_contents():
+            parser = AsyncLinkParser(cache=self.cache)
+            try:
+                return [bytes(await parser.get_content(url)) for url in urls]
+            finally:
+                await AsyncLinkParser.aclose()
+
+        return asyncio.run(get_contents())
+
+    def test_off_loop(self):
+        threads = set()
+        for name in ("get", "open", "revalidated"):
+            method = getattr(self.cache, name)
+
+            def record(*args, method=method):
+                threads.add(threading.current_thread())
+                return method(*args)
+
+            setattr(self.cache, name, record)
+        fresh = f"{self.get_url('/cached/a')}?max_age=60"
+        stale = self.get_url("/cached/b")
+        self.get_contents([fresh, fresh, stale, stale])
+        self.assertEqual(self.server.not_modified["/cached/b"], 1)
+        self.assertTrue(threads)
+        # asyncio.run runs the loop in this thread
+        self.assertNotIn(threading.current_thread(), threads)